@@ -0,0 +1,512 @@
+from dataclasses import dataclass
+from typing import Literal, TypeAlias
+
+import numpy as np
+import pandas as pd
+
+from app.data_index import Conditions, DateRange, DimensionIndex, select_rows
+from app.data_loader import concat_frames
+
+Metric: TypeAlias = Literal["revenue", "profit", "quantity"]
+SalesBreakdown: TypeAlias = Literal["store", "category", "product_name"]
+
+METRICS: list[Metric] = ["revenue", "profit", "quantity"]
+
+CUSTOMER_STATUSES = pd.CategoricalDtype(
+    ["Новий", "Постійний", "VIP + Новий", "VIP + Постійний"]
+)
+
+# The emoji carry the colour coding, so tables need no per-cell styling.
+STOCK_STATUSES = pd.CategoricalDtype(
+    ["🔴 Відсутній", "🟡 Низький", "🟢 Нормальний"], ordered=True
+)
+
+CUBE_DIMENSIONS = ["date", "store", "category", "size", "gender", "product_name"]
+CUBE_MEASURES = ["revenue", "quantity", "cost_total", "orders"]
+
+LAST_SALE_KEYS = ["store", "product_id", "size"]
+
+
+@dataclass(frozen=True)
+class SalesFilters:
+    date_range: DateRange | None = None
+    stores: tuple[str, ...] | None = None
+    categories: tuple[str, ...] | None = None
+    products: tuple[str, ...] | None = None
+    sizes: tuple[str, ...] | None = None
+    gender: str | None = None
+
+
+@dataclass(frozen=True)
+class InventoryFilters:
+    stores: tuple[str, ...] | None = None
+    categories: tuple[str, ...] | None = None
+    sizes: tuple[str, ...] | None = None
+
+
+@dataclass(frozen=True)
+class CustomerFilters:
+    stores: tuple[str, ...] | None = None
+    gender: str | None = None
+    age_range: tuple[int, int] | None = None
+
+
+@dataclass(frozen=True)
+class SalesCube:
+    # Daily sums over every cube dimension, and the same sums without the
+    # product, which is far smaller when the catalog is large.
+    products: pd.DataFrame
+    totals: pd.DataFrame
+    products_index: DimensionIndex
+    totals_index: DimensionIndex
+
+
+@dataclass(frozen=True)
+class LastSales:
+    # Latest sale date per store and product, and per store, product and size,
+    # indexed by those keys.
+    by_product: pd.Series
+    by_size: pd.Series
+
+    def lookup(self, df: pd.DataFrame, by_size: bool = False) -> pd.Series:
+        dates = self.by_size if by_size else self.by_product
+        keys = pd.MultiIndex.from_frame(df[list(dates.index.names)])
+        return pd.Series(
+            dates.reindex(keys).to_numpy(), index=df.index, name="last_sale_date"
+        )
+
+
+@dataclass(frozen=True)
+class SalesSummary:
+    # Every frame has one column per metric; totals also counts orders.
+    totals: dict[str, float]
+    daily: pd.DataFrame
+    by_store: pd.DataFrame
+    by_category: pd.DataFrame
+    by_product: pd.DataFrame
+    average_check: float
+
+    def total(self, metric: Metric) -> float:
+        return self.totals[metric]
+
+    def daily_totals(self, metric: Metric) -> pd.Series:
+        return self.daily[metric]
+
+    def totals_by(self, column: SalesBreakdown, metric: Metric) -> pd.Series:
+        breakdowns = {
+            "store": self.by_store,
+            "category": self.by_category,
+            "product_name": self.by_product,
+        }
+        return breakdowns[column][metric]
+
+    def top_products(self, metric: Metric, n: int = 10) -> pd.Series:
+        # Stable sorting keeps ties in product order, whatever engine summed them.
+        return self.by_product[metric].sort_values(kind="stable").tail(n)
+
+    def top_product(self, metric: Metric) -> str:
+        return self.by_product[metric].idxmax()
+
+    @property
+    def average_order_value(self) -> float:
+        return self.totals["revenue"] / self.totals["orders"]
+
+    @property
+    def unique_products(self) -> int:
+        return len(self.by_product)
+
+
+@dataclass(frozen=True)
+class InventoryKpis:
+    total_sku: int
+    total_items: int
+    low_stock: int
+    zero_stock: int
+    excess_stock: int
+    to_order: int
+
+
+# Sales.
+def sales_conditions(filters: SalesFilters) -> Conditions:
+    return {
+        "store": filters.stores,
+        "category": filters.categories,
+        "size": filters.sizes,
+        "product_name": filters.products or None,
+        "gender": None if filters.gender is None else (filters.gender,),
+    }
+
+
+def filter_sales(
+    df: pd.DataFrame, filters: SalesFilters, index: DimensionIndex | None = None
+) -> pd.DataFrame:
+    return select_rows(
+        df, sales_conditions(filters), index, date_range=filters.date_range
+    )
+
+
+def build_sales_cube(df: pd.DataFrame) -> SalesCube:
+    products, totals = _aggregate_sales(df)
+    return _to_cube(products, totals)
+
+
+def update_sales_cube(
+    cube: SalesCube, df: pd.DataFrame, window: tuple[pd.Timestamp, pd.Timestamp]
+) -> SalesCube:
+    # Only the days inside the window changed, so only their rows are summed
+    # again and spliced between the untouched days of the cube.
+    days = _whole_days(window)
+    products, totals = _aggregate_sales(df.iloc[_window_rows(df, days)])
+    return _to_cube(
+        _splice_days(cube.products, products, days),
+        _splice_days(cube.totals, totals, days),
+    )
+
+
+def cube_view(
+    cube: SalesCube, filters: SalesFilters, by_product: bool = False
+) -> pd.DataFrame:
+    # Cube rows keep the transaction column names, so every sales function
+    # below accepts them in place of the raw frame.
+    if by_product or filters.products:
+        return filter_sales(cube.products, filters, cube.products_index)
+    return filter_sales(cube.totals, filters, cube.totals_index)
+
+
+def cost_totals(df: pd.DataFrame) -> pd.Series:
+    if "cost_total" in df:
+        return df["cost_total"]
+    return df["cost"] * df["quantity"]
+
+
+def order_counts(df: pd.DataFrame) -> pd.Series:
+    if "orders" in df:
+        return df["orders"]
+    return pd.Series(1, index=df.index, name="orders")
+
+
+def metric_values(df: pd.DataFrame, metric: Metric) -> pd.Series:
+    if metric == "profit":
+        return (df["revenue"] - cost_totals(df)).rename("profit")
+    return df[metric]
+
+
+def sale_days(df: pd.DataFrame) -> pd.Series:
+    # Sales may carry a time of day; the cube and every daily figure count
+    # whole days.
+    return df["date"].dt.normalize()
+
+
+def average_check(df: pd.DataFrame) -> float:
+    per_store_day = (
+        pd.DataFrame({"revenue": df["revenue"], "orders": order_counts(df)})
+        .groupby([sale_days(df), df["store"]], observed=True)
+        .sum()
+    )
+    return (per_store_day["revenue"] / per_store_day["orders"]).mean()
+
+
+def summarize_sales(
+    totals_df: pd.DataFrame, products_df: pd.DataFrame | None = None
+) -> SalesSummary:
+    # Works on raw transactions as well as on both levels of the daily cube.
+    if products_df is None:
+        products_df = totals_df
+
+    measures = _metric_frame(totals_df)
+    return SalesSummary(
+        totals={column: measures[column].sum() for column in measures},
+        daily=measures[METRICS].groupby(sale_days(totals_df)).sum(),
+        by_store=measures[METRICS].groupby(totals_df["store"], observed=True).sum(),
+        by_category=(
+            measures[METRICS].groupby(totals_df["category"], observed=True).sum()
+        ),
+        by_product=(
+            _metric_frame(products_df)[METRICS]
+            .groupby(products_df["product_name"], observed=True)
+            .sum()
+        ),
+        average_check=average_check(totals_df),
+    )
+
+
+def sales_details(df: pd.DataFrame, with_profit: bool = False) -> pd.DataFrame:
+    columns = [
+        "date",
+        "store",
+        "product_name",
+        "category",
+        "size",
+        "quantity",
+        "price",
+        "revenue",
+        "cost",
+    ]
+    details = df[columns]
+    if with_profit:
+        details = details.assign(profit=metric_values(df, "profit"))
+    # Uploaded sales are stored by date, so newest first is just the reverse.
+    if details["date"].is_monotonic_increasing:
+        return details.iloc[::-1]
+    return details.sort_values("date", ascending=False)
+
+
+# Inventory.
+def filter_by_store(
+    df: pd.DataFrame, store: str | None, index: DimensionIndex | None = None
+) -> pd.DataFrame:
+    return select_rows(df, {"store": None if store is None else (store,)}, index)
+
+
+def filter_inventory(
+    df: pd.DataFrame, filters: InventoryFilters, index: DimensionIndex | None = None
+) -> pd.DataFrame:
+    return select_rows(
+        df,
+        {
+            "store": filters.stores,
+            "category": filters.categories,
+            "size": filters.sizes,
+        },
+        index,
+    )
+
+
+def inventory_kpis(df: pd.DataFrame, excess_threshold: float = 3.0) -> InventoryKpis:
+    stock_qty, min_qty = df["stock_qty"], df["min_qty"]
+    return InventoryKpis(
+        total_sku=df["product_id"].nunique(),
+        total_items=stock_qty.sum(),
+        low_stock=int((stock_qty < min_qty).sum()),
+        zero_stock=int((stock_qty == 0).sum()),
+        excess_stock=int((stock_qty > min_qty * excess_threshold).sum()),
+        to_order=int(((stock_qty <= min_qty) & (stock_qty > 0)).sum()),
+    )
+
+
+def stock_by_category(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    stock_by_cat = (
+        df.groupby(["category", "store"], observed=True)["stock_qty"]
+        .sum()
+        .reset_index()
+    )
+    total_by_cat = (
+        stock_by_cat.groupby("category", observed=True)["stock_qty"]
+        .sum()
+        .reset_index()
+        .rename(columns={"stock_qty": "total"})
+    )
+    return stock_by_cat.merge(total_by_cat, on="category"), total_by_cat
+
+
+def low_stock_items(df: pd.DataFrame) -> pd.DataFrame:
+    return df[df["stock_qty"] < df["min_qty"]]
+
+
+def build_last_sales(df: pd.DataFrame) -> LastSales:
+    return _to_last_sales(_last_sale_dates(df))
+
+
+def update_last_sales(
+    last_sales: LastSales, df: pd.DataFrame, window: tuple[pd.Timestamp, pd.Timestamp]
+) -> LastSales:
+    # Dates outside the window still hold. Dates inside it may come from rows
+    # the delta replaced, so they are taken from the window again, or from the
+    # rows before it for the rare keys left without any sale in the window.
+    window_rows = _window_rows(df, window)
+    window_dates = _last_sale_dates(df.iloc[window_rows])
+
+    dates = last_sales.by_size
+    in_window = (dates >= window[0]) & (dates <= window[1])
+    lost_keys = dates.index[in_window & ~dates.index.isin(window_dates.index)]
+    parts = [dates[~in_window], window_dates]
+    if len(lost_keys):
+        earlier_df = df.iloc[: window_rows.start]
+        earlier_keys = pd.MultiIndex.from_frame(earlier_df[LAST_SALE_KEYS])
+        parts.append(_last_sale_dates(earlier_df[earlier_keys.isin(lost_keys)]))
+    return _to_last_sales(
+        pd.concat(parts).groupby(level=LAST_SALE_KEYS, observed=True).max()
+    )
+
+
+def dead_stock_items(
+    inventory_df: pd.DataFrame,
+    last_sales: LastSales,
+    dead_stock_days: int,
+    excess_threshold: float,
+    by_size: bool = False,
+) -> pd.DataFrame:
+    # Only excess items can be dead stock, so only they are looked up.
+    excess_df = inventory_df[
+        inventory_df["stock_qty"] > inventory_df["min_qty"] * excess_threshold
+    ]
+    last_sale_date = last_sales.lookup(excess_df, by_size)
+
+    dead_stock_threshold = pd.Timestamp("now") - pd.Timedelta(days=dead_stock_days)
+    dead_stock_mask = (last_sale_date < dead_stock_threshold) | last_sale_date.isna()
+    return (
+        excess_df[dead_stock_mask]
+        .assign(last_sale_date=last_sale_date[dead_stock_mask])
+        .sort_values("stock_qty", ascending=False)
+    )
+
+
+def stock_status(df: pd.DataFrame) -> pd.Series:
+    codes = np.select(
+        [df["stock_qty"] == 0, df["stock_qty"] < df["min_qty"]], [0, 1], default=2
+    )
+    return pd.Series(
+        pd.Categorical.from_codes(codes, dtype=STOCK_STATUSES),
+        index=df.index,
+        name="status",
+    )
+
+
+# Customers.
+def filter_customers(
+    df: pd.DataFrame, filters: CustomerFilters, index: DimensionIndex | None = None
+) -> pd.DataFrame:
+    df = select_rows(
+        df,
+        {
+            "store": filters.stores,
+            "gender": None if filters.gender is None else (filters.gender,),
+        },
+        index,
+    )
+
+    if filters.age_range is not None:
+        df = df[df["age"].between(*filters.age_range)]
+    return df
+
+
+def add_status_flags(df: pd.DataFrame, vip_threshold: float) -> pd.DataFrame:
+    return df.assign(
+        is_new=df["total_orders"] == 1,
+        is_regular=df["total_orders"] > 1,
+        is_vip=df["total_spent"] >= vip_threshold,
+    )
+
+
+def filter_by_statuses(df: pd.DataFrame, statuses: list[str]) -> pd.DataFrame:
+    if not statuses:
+        return df
+
+    status_mask = pd.Series(False, index=df.index)
+    if "Нові" in statuses:
+        status_mask |= df["is_new"]
+    if "Постійні" in statuses:
+        status_mask |= df["is_regular"]
+    if "VIP" in statuses:
+        status_mask |= df["is_vip"]
+    return df[status_mask]
+
+
+def add_status_labels(df: pd.DataFrame) -> pd.DataFrame:
+    codes = df["is_vip"].to_numpy(np.int8) * 2 + df["is_regular"].to_numpy(np.int8)
+    return df.assign(statuses=pd.Categorical.from_codes(codes, dtype=CUSTOMER_STATUSES))
+
+
+def monthly_signups(df: pd.DataFrame) -> pd.Series:
+    return df.groupby(df["signup_date"].dt.to_period("M")).size()
+
+
+def inactive_customers(df: pd.DataFrame, inactive_days: int) -> int:
+    inactive_threshold = pd.Timestamp("now") - pd.Timedelta(days=inactive_days)
+    return int((df["last_purchase_date"] < inactive_threshold).sum())
+
+
+def customers_table(df: pd.DataFrame) -> pd.DataFrame:
+    display_cols = [
+        "customer_id",
+        "total_orders",
+        "total_spent",
+        "last_purchase_date",
+        "statuses",
+        "segment",
+        "rfm_score",
+    ]
+    table_df = df[display_cols].copy()
+    table_df["avg_check"] = table_df["total_spent"] / table_df["total_orders"]
+    return table_df
+
+
+def _aggregate_sales(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    measures = pd.DataFrame(
+        {
+            "revenue": df["revenue"],
+            "quantity": df["quantity"].astype("int64"),
+            "cost_total": cost_totals(df).astype("float64"),
+            "orders": order_counts(df).astype("int64"),
+        }
+    )
+    products = (
+        measures.groupby(
+            [sale_days(df) if dim == "date" else df[dim] for dim in CUBE_DIMENSIONS],
+            observed=True,
+        )
+        .sum()
+        .reset_index()
+    )
+    totals = (
+        products.groupby(CUBE_DIMENSIONS[:-1], observed=True)[CUBE_MEASURES]
+        .sum()
+        .reset_index()
+    )
+    return products, totals
+
+
+def _to_cube(products: pd.DataFrame, totals: pd.DataFrame) -> SalesCube:
+    return SalesCube(
+        products=products,
+        totals=totals,
+        products_index=DimensionIndex.build(products, CUBE_DIMENSIONS[1:], "date"),
+        totals_index=DimensionIndex.build(totals, CUBE_DIMENSIONS[1:-1], "date"),
+    )
+
+
+def _splice_days(
+    df: pd.DataFrame,
+    replacement: pd.DataFrame,
+    window: tuple[pd.Timestamp, pd.Timestamp],
+) -> pd.DataFrame:
+    rows = _window_rows(df, window)
+    return concat_frames([df.iloc[: rows.start], replacement, df.iloc[rows.stop :]])
+
+
+def _whole_days(
+    window: tuple[pd.Timestamp, pd.Timestamp],
+) -> tuple[pd.Timestamp, pd.Timestamp]:
+    return (
+        window[0].normalize(),
+        window[1].normalize() + pd.Timedelta(days=1) - pd.Timedelta(1, "ns"),
+    )
+
+
+def _window_rows(df: pd.DataFrame, window: tuple[pd.Timestamp, pd.Timestamp]) -> slice:
+    return slice(
+        df["date"].searchsorted(window[0]),
+        df["date"].searchsorted(window[1], side="right"),
+    )
+
+
+def _last_sale_dates(df: pd.DataFrame) -> pd.Series:
+    return df.groupby(LAST_SALE_KEYS, observed=True)["date"].max()
+
+
+def _to_last_sales(by_size: pd.Series) -> LastSales:
+    return LastSales(
+        by_product=by_size.groupby(level=["store", "product_id"], observed=True).max(),
+        by_size=by_size,
+    )
+
+
+def _metric_frame(df: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "revenue": df["revenue"],
+            "profit": metric_values(df, "profit"),
+            "quantity": df["quantity"],
+            "orders": order_counts(df),
+        }
+    )
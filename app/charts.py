@@ -0,0 +1,27 @@
+from typing import TypeVar
+
+import numpy as np
+import pandas as pd
+
+from app.settings import settings
+
+ChartData = TypeVar("ChartData", pd.Series, pd.DataFrame)
+
+
+def downsample(data: ChartData, max_points: int | None = None) -> ChartData:
+    # Keeps the lowest and the highest point of every bucket, so peaks and dips
+    # survive while a chart never gets much more than max_points points, however
+    # long the selected period is.
+    max_points = max_points or settings.chart_points
+    if len(data) <= max_points:
+        return data
+
+    values = data.to_frame() if isinstance(data, pd.Series) else data
+    bucket_count = max(1, max_points // (2 * values.shape[1]))
+    buckets = np.arange(len(data)) * bucket_count // len(data)
+
+    positions = [np.array([0, len(data) - 1])]
+    for _, column in values.reset_index(drop=True).items():
+        grouped = column.groupby(buckets)
+        positions += [grouped.idxmin().to_numpy(), grouped.idxmax().to_numpy()]
+    return data.iloc[np.unique(np.concatenate(positions))]
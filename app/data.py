@@ -1,79 +1,161 @@
 from dataclasses import dataclass
-from typing import Literal, TypeAlias
+from typing import Callable, Literal, TypeAlias, TypeVar
 
 import pandas as pd
 import streamlit as st
 
+from app.data_index import DimensionIndex
+from app.data_registry import Dataset, DatasetHandle, dataset_registry
+
 ColumnType: TypeAlias = Literal["string", "numeric", "datetime"]
 Column: TypeAlias = tuple[str, ColumnType, dict | None]
 Columns: TypeAlias = list[Column]
 
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class DataSources:
+    # Fingerprints of the full file and of the delta files merged into it.
+    base: str
+    deltas: tuple[str, ...] = ()
+
 
 @dataclass
 class DataConfig:
     key: str
     columns: Columns
+    # Rows are kept sorted by this column, so ranges over it are slices.
+    sort_by: str | None = None
+    # Delta rows replace the existing rows with the same values in these columns.
+    key_columns: list[str] | None = None
 
     @property
     def column_names(self) -> list[str]:
         return [col[0] for col in self.columns]
 
     @property
-    def session_state(self) -> pd.DataFrame | None:
+    def category_columns(self) -> list[str]:
+        return [
+            col_name
+            for col_name, col_type, rules in self.columns
+            if col_type == "string" and rules and rules.get("dtype") == "category"
+        ]
+
+    @property
+    def numeric_dtypes(self) -> dict[str, str]:
+        return {
+            col_name: rules["dtype"]
+            for col_name, col_type, rules in self.columns
+            if col_type == "numeric" and rules and "dtype" in rules
+        }
+
+    @property
+    def indexed_columns(self) -> list[str]:
+        return [
+            col_name
+            for col_name, _, rules in self.columns
+            if rules and rules.get("index")
+        ]
+
+    # Sessions only hold a handle; the frame and everything derived from it
+    # live in the process-wide registry, once per distinct content.
+    @property
+    def handle(self) -> DatasetHandle | None:
         return st.session_state.get(self.key)
 
-    @session_state.setter
-    def session_state(self, value: pd.DataFrame) -> None:
-        st.session_state[self.key] = value
+    @property
+    def dataset(self) -> Dataset | None:
+        handle = self.handle
+        return handle.dataset if handle is not None else None
+
+    @property
+    def session_state(self) -> pd.DataFrame | None:
+        dataset = self.dataset
+        return dataset.df if dataset is not None else None
 
     @session_state.deleter
     def session_state(self) -> None:
-        if self.key in st.session_state:
-            del st.session_state[self.key]
+        handle = st.session_state.pop(self.key, None)
+        if handle is not None:
+            handle.release()
+
+    @property
+    def sources(self) -> DataSources | None:
+        handle = self.handle
+        return handle.key[1] if handle is not None else None
+
+    def attach(self, sources: DataSources, df: pd.DataFrame | None = None) -> bool:
+        # Without a frame, only a dataset some session already registered for
+        # the same sources can be attached.
+        if self.sources == sources:
+            return True
+        handle = dataset_registry.acquire((self.key, sources), df)
+        if handle is None:
+            return False
+
+        previous = st.session_state.get(self.key)
+        st.session_state[self.key] = handle
+        if previous is not None:
+            previous.release()
+        return True
+
+    def derive(self, name: str, build: Callable[[pd.DataFrame], T]) -> T:
+        return self.dataset.derive(name, build)
+
+    @property
+    def index(self) -> DimensionIndex:
+        return self.derive("index", self.build_index)
+
+    def build_index(self, df: pd.DataFrame) -> DimensionIndex:
+        return DimensionIndex.build(df, self.indexed_columns, self.sort_by)
 
 
 sales_data = DataConfig(
     key="sales_data",
     columns=[
-        ("date", "datetime", None),
-        ("store", "string", None),
-        ("product_id", "string", None),
-        ("product_name", "string", None),
-        ("category", "string", None),
-        ("size", "string", None),
-        ("gender", "string", None),
-        ("age_group", "string", None),
-        ("quantity", "numeric", {"min": 1}),
-        ("price", "numeric", {"min": 0}),
-        ("cost", "numeric", {"min": 0}),
+        ("date", "datetime", {"format": "ISO8601"}),
+        ("store", "string", {"dtype": "category", "index": True}),
+        ("product_id", "string", {"dtype": "category"}),
+        ("product_name", "string", {"dtype": "category", "index": True}),
+        ("category", "string", {"dtype": "category", "index": True}),
+        ("size", "string", {"dtype": "category", "index": True}),
+        ("gender", "string", {"dtype": "category", "index": True}),
+        ("age_group", "string", {"dtype": "category"}),
+        ("quantity", "numeric", {"min": 1, "dtype": "int16"}),
+        ("price", "numeric", {"min": 0, "dtype": "float32"}),
+        ("cost", "numeric", {"min": 0, "dtype": "float32"}),
         ("revenue", "numeric", {"min": 0}),
     ],
+    sort_by="date",
+    key_columns=["date", "store", "product_id"],
 )
 
 inventory_data = DataConfig(
     key="inventory_data",
     columns=[
-        ("store", "string", None),
-        ("product_id", "string", None),
-        ("product_name", "string", None),
-        ("category", "string", None),
-        ("size", "string", None),
-        ("stock_qty", "numeric", {"min": 0}),
-        ("min_qty", "numeric", {"min": 0}),
-        ("last_updated", "datetime", None),
+        ("store", "string", {"dtype": "category", "index": True}),
+        ("product_id", "string", {"dtype": "category"}),
+        ("product_name", "string", {"dtype": "category"}),
+        ("category", "string", {"dtype": "category", "index": True}),
+        ("size", "string", {"dtype": "category", "index": True}),
+        ("stock_qty", "numeric", {"min": 0, "dtype": "int32"}),
+        ("min_qty", "numeric", {"min": 0, "dtype": "int32"}),
+        ("last_updated", "datetime", {"format": "ISO8601"}),
     ],
+    key_columns=["store", "product_id", "size"],
 )
 
 customers_data = DataConfig(
     key="customers_data",
     columns=[
         ("customer_id", "string", None),
-        ("age", "numeric", {"min": 0}),
-        ("gender", "string", None),
-        ("signup_date", "datetime", None),
-        ("store", "string", None),
-        ("total_orders", "numeric", {"min": 1}),
+        ("age", "numeric", {"min": 0, "dtype": "int16"}),
+        ("gender", "string", {"dtype": "category", "index": True}),
+        ("signup_date", "datetime", {"format": "ISO8601"}),
+        ("store", "string", {"dtype": "category", "index": True}),
+        ("total_orders", "numeric", {"min": 1, "dtype": "int32"}),
         ("total_spent", "numeric", {"min": 0}),
-        ("last_purchase_date", "datetime", None),
+        ("last_purchase_date", "datetime", {"format": "ISO8601"}),
     ],
 )
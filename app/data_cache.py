@@ -0,0 +1,137 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable
+
+from app.data import DataConfig, DataSources
+from app.data_loader import LoadResult, LoadTask, submit_load
+from app.data_registry import dataset_registry
+from app.settings import settings
+
+MAX_REMEMBERED_DIGESTS = 64
+
+
+class DataCache:
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[LoadResult, int]] = OrderedDict()
+        self._used_bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def used_bytes(self) -> int:
+        return self._used_bytes
+
+    def get(self, key: str) -> LoadResult | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(
+        self,
+        key: str,
+        result: LoadResult,
+        stored_elsewhere: Callable[[], bool] | None = None,
+    ) -> None:
+        df, _ = result
+        size = int(df.memory_usage(deep=True).sum()) if df is not None else 0
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            # Checked under the lock, so a result handed over and discarded in
+            # the meantime is not stored again.
+            if stored_elsewhere is not None and stored_elsewhere():
+                return
+            if key in self._entries:
+                self._used_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (result, size)
+            self._used_bytes += size
+
+            # Evict least recently used entries until the budget is respected.
+            while self._used_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._used_bytes -= evicted_size
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._used_bytes -= entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._used_bytes = 0
+
+
+def submit_cached_load(uploaded_file: io.BytesIO, data_config: DataConfig) -> LoadTask:
+    # Reruns with the same file attached reuse the already validated result.
+    cache_key = file_fingerprint(uploaded_file, data_config)
+    # Full files handed over to the dataset registry are read back from there,
+    # where the memory budget covers them, instead of being kept twice.
+    handle = dataset_registry.acquire((data_config.key, DataSources(cache_key)))
+    if handle is not None:
+        df = handle.dataset.df
+        handle.release()
+        upload_cache.discard(cache_key)
+        return LoadTask.completed((df, []))
+
+    result = upload_cache.get(cache_key)
+    if result is not None:
+        return LoadTask.completed(result)
+
+    task = submit_load(uploaded_file, data_config)
+
+    def cache_result(future: Future[LoadResult]) -> None:
+        if future.exception() is None:
+            upload_cache.put(
+                cache_key,
+                future.result(),
+                lambda: (data_config.key, DataSources(cache_key)) in dataset_registry,
+            )
+
+    task.future.add_done_callback(cache_result)
+    return task
+
+
+# Streamlit keeps the same uploaded file object id across reruns, so the digest
+# of its content only has to be computed once per upload.
+_content_digests: OrderedDict[str, str] = OrderedDict()
+_content_digests_lock = threading.Lock()
+
+
+def file_fingerprint(uploaded_file: io.BytesIO, data_config: DataConfig) -> str:
+    fingerprint = hashlib.blake2b(digest_size=16)
+    fingerprint.update(_content_digest(uploaded_file).encode())
+    fingerprint.update(uploaded_file.name.rsplit(".", 1)[-1].lower().encode())
+    fingerprint.update(data_config.key.encode())
+    fingerprint.update(repr(data_config.columns).encode())
+    return fingerprint.hexdigest()
+
+
+def _content_digest(uploaded_file: io.BytesIO) -> str:
+    file_id = getattr(uploaded_file, "file_id", None)
+    if file_id is not None:
+        with _content_digests_lock:
+            if file_id in _content_digests:
+                _content_digests.move_to_end(file_id)
+                return _content_digests[file_id]
+
+    # getvalue() shares the uploaded bytes instead of copying them.
+    digest = hashlib.blake2b(uploaded_file.getvalue(), digest_size=16).hexdigest()
+
+    if file_id is not None:
+        with _content_digests_lock:
+            _content_digests[file_id] = digest
+            if len(_content_digests) > MAX_REMEMBERED_DIGESTS:
+                _content_digests.popitem(last=False)
+    return digest
+
+
+upload_cache = DataCache(max_bytes=settings.upload_cache_mb * 1024**2)
@@ -0,0 +1,111 @@
+from typing import Any, Callable, TypeAlias
+
+import pandas as pd
+
+from app.analytics import update_last_sales, update_sales_cube
+from app.data import DataConfig, DataSources
+from app.data_cache import upload_cache
+from app.data_loader import concat_frames, sort_rows
+from app.data_registry import Dataset, DatasetHandle, dataset_registry
+
+Window: TypeAlias = tuple[pd.Timestamp, pd.Timestamp]
+DerivedUpdate: TypeAlias = Callable[[Any, pd.DataFrame, Window], Any]
+Upload: TypeAlias = tuple[str, pd.DataFrame]
+
+# Derived artifacts that can absorb a delta by recomputing the changed window of
+# the sort column. Every other artifact is dropped and rebuilt when next needed.
+derived_updates: dict[str, DerivedUpdate] = {
+    "cube": update_sales_cube,
+    "last_sales": update_last_sales,
+}
+
+
+def sync_uploads(data_config: DataConfig, base: Upload, deltas: list[Upload]) -> None:
+    base_id, base_df = base
+    delta_ids = tuple(delta_id for delta_id, _ in deltas)
+
+    # Another session may already have merged the same files.
+    if data_config.attach(DataSources(base_id, delta_ids)):
+        return
+
+    # Deltas added after the last rerun are merged into the current frame; any
+    # other change of the uploaded files starts over from the full file.
+    sources = data_config.sources
+    if (
+        sources is not None
+        and sources.base == base_id
+        and sources.deltas == delta_ids[: len(sources.deltas)]
+    ):
+        applied = len(sources.deltas)
+    else:
+        data_config.attach(DataSources(base_id), base_df)
+        # The registry holds the full file from now on; delta files stay in the
+        # upload cache, as only the frames merged from them are registered.
+        upload_cache.discard(base_id)
+        applied = 0
+
+    for count, (_, delta_df) in enumerate(deltas[applied:], start=applied + 1):
+        apply_delta(data_config, DataSources(base_id, delta_ids[:count]), delta_df)
+
+
+def apply_delta(
+    data_config: DataConfig, sources: DataSources, delta_df: pd.DataFrame
+) -> None:
+    handle = merge_dataset(data_config, data_config.dataset, sources, delta_df)
+    data_config.attach(sources)
+    handle.release()
+
+
+def merge_dataset(
+    data_config: DataConfig,
+    previous: Dataset,
+    sources: DataSources,
+    delta_df: pd.DataFrame,
+) -> DatasetHandle:
+    merged_df, window = merge_delta(previous.df, delta_df, data_config)
+    handle = dataset_registry.acquire((data_config.key, sources), merged_df)
+    if window is None:
+        return handle
+
+    # The previous artifacts may still be used by other sessions, so updated
+    # copies go to the merged dataset and the previous ones stay untouched.
+    with previous.lock:
+        previous_derived = dict(previous.derived)
+    for name, update in derived_updates.items():
+        if name in previous_derived:
+            handle.dataset.derive(
+                name, lambda df: update(previous_derived[name], df, window)
+            )
+    return handle
+
+
+def merge_delta(
+    df: pd.DataFrame, delta_df: pd.DataFrame, data_config: DataConfig
+) -> tuple[pd.DataFrame, Window | None]:
+    key_columns = data_config.key_columns or data_config.column_names
+    sort_by = data_config.sort_by
+
+    if sort_by is None or sort_by not in key_columns:
+        kept_df = df[~_matches_keys(df, delta_df, key_columns)]
+        return concat_frames([kept_df, delta_df]), None
+
+    # Rows sharing a key with the delta can only lie between its first and last
+    # value of the sort column, so only that window of the frame is rewritten.
+    delta_df = sort_rows(delta_df, data_config)
+    window = (delta_df[sort_by].iloc[0], delta_df[sort_by].iloc[-1])
+    start = df[sort_by].searchsorted(window[0])
+    stop = df[sort_by].searchsorted(window[1], side="right")
+
+    window_df = df.iloc[start:stop]
+    window_df = window_df[~_matches_keys(window_df, delta_df, key_columns)]
+    window_df = sort_rows(concat_frames([window_df, delta_df]), data_config)
+    merged_df = concat_frames([df.iloc[:start], window_df, df.iloc[stop:]])
+    return merged_df, window
+
+
+def _matches_keys(
+    df: pd.DataFrame, delta_df: pd.DataFrame, key_columns: list[str]
+) -> pd.Series:
+    keys = pd.MultiIndex.from_frame(df[key_columns])
+    delta_keys = pd.MultiIndex.from_frame(delta_df[key_columns])
+    return pd.Series(keys.isin(delta_keys), index=df.index)
@@ -0,0 +1,287 @@
+import hashlib
+import io
+import threading
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+from pyarrow import feather
+
+from app.data import DataConfig, DataSources, customers_data, inventory_data, sales_data
+from app.data_delta import merge_dataset
+from app.data_loader import load_file
+from app.data_registry import DatasetHandle, dataset_registry
+from app.precompute import precomputed
+from app.settings import settings
+
+DATA_CONFIGS = [sales_data, inventory_data, customers_data]
+FILE_SUFFIXES = (".csv", ".xlsx")
+# Pages wait this long for the first scan, then render without directory data.
+READY_WAIT_SECONDS = 5
+
+
+class DataDirectory:
+    # Files are named after the dataset, e.g. "sales.csv" holds the full data and
+    # "sales-2025-06-01.csv" a delta; deltas are merged in file name order.
+    def __init__(self, path: Path, cache_path: Path) -> None:
+        self.path = path
+        self.cache_path = cache_path
+        # Errors by file name or dataset key; failed files are retried once changed.
+        self._errors: dict[str, list[str]] = {}
+        self._failed: dict[str, str] = {}
+        self.ready = threading.Event()
+        self._handles: dict[str, DatasetHandle] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread.ident is None:
+                self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    @property
+    def errors(self) -> dict[str, list[str]]:
+        # A copy, as the watcher changes the errors while pages list them.
+        with self._lock:
+            return dict(self._errors)
+
+    def sources(self, data_config: DataConfig) -> DataSources | None:
+        with self._lock:
+            handle = self._handles.get(data_config.key)
+        return handle.key[1] if handle is not None else None
+
+    def scan(self) -> None:
+        # A failing dataset keeps its last loaded data and does not stop the
+        # watcher from picking up the others.
+        for data_config in DATA_CONFIGS:
+            try:
+                self._sync(data_config)
+            except Exception as err:
+                self._set_errors(data_config.key, [str(err)])
+            else:
+                self._set_errors(data_config.key, [])
+
+    def _watch(self) -> None:
+        # Polling keeps working on network drives, where file events often
+        # never arrive.
+        while True:
+            self.scan()
+            self.ready.set()
+            if not settings.data_poll_seconds or self._stopped.wait(
+                settings.data_poll_seconds
+            ):
+                return
+
+    def _sync(self, data_config: DataConfig) -> None:
+        base, deltas = self._files(data_config)
+        self._forget_removed(
+            data_config, {path.name for path in [base, *deltas] if path is not None}
+        )
+        handle = self._handles.get(data_config.key)
+        if base is None:
+            if handle is not None:
+                self._replace(data_config, None)
+                self._remove_stale_cache(data_config, set())
+            return
+
+        base_id = self._fingerprint(base, data_config)
+        if self._failed.get(base.name) == base_id:
+            return
+        deltas = [
+            (path, file_id)
+            for path in deltas
+            if self._failed.get(path.name)
+            != (file_id := self._fingerprint(path, data_config))
+        ]
+        delta_ids = tuple(file_id for _, file_id in deltas)
+        current = handle.key[1] if handle is not None else None
+        if current == DataSources(base_id, delta_ids):
+            return
+
+        # As with uploads, new deltas are merged into the current frame and any
+        # other change starts over from the full file.
+        if (
+            current is not None
+            and current.base == base_id
+            and current.deltas == delta_ids[: len(current.deltas)]
+        ):
+            applied = len(current.deltas)
+        else:
+            base_df = self._read(base, base_id, data_config)
+            if base_df is None:
+                return
+            handle = dataset_registry.acquire(
+                (data_config.key, DataSources(base_id)), base_df
+            )
+            applied = 0
+
+        for count, (path, file_id) in enumerate(deltas[applied:], start=applied + 1):
+            delta_df = self._read(path, file_id, data_config)
+            if delta_df is None:
+                break
+            merged = merge_dataset(
+                data_config,
+                handle.dataset,
+                DataSources(base_id, delta_ids[:count]),
+                delta_df,
+            )
+            if handle is not self._handles.get(data_config.key):
+                handle.release()
+            handle = merged
+
+        for name, build in precomputed[data_config.key].items():
+            handle.dataset.derive(name, build)
+        if handle is not self._handles.get(data_config.key):
+            self._replace(data_config, handle)
+        self._remove_stale_cache(data_config, {base_id, *delta_ids})
+
+    def _replace(self, data_config: DataConfig, handle: DatasetHandle | None) -> None:
+        with self._lock:
+            previous = self._handles.pop(data_config.key, None)
+            if handle is not None:
+                self._handles[data_config.key] = handle
+        if previous is not None:
+            previous.release()
+
+    def _remove_stale_cache(self, data_config: DataConfig, file_ids: set[str]) -> None:
+        # Files that were replaced or removed are never read again. Frames still
+        # mapped from a removed file keep it readable until they are dropped.
+        for cache_file in self.cache_path.glob(f"{data_config.key}.*.arrow"):
+            if cache_file.suffixes[0].removeprefix(".") not in file_ids:
+                cache_file.unlink(missing_ok=True)
+
+    def _set_errors(self, name: str, errors: list[str]) -> None:
+        with self._lock:
+            if errors:
+                self._errors[name] = errors
+            else:
+                self._errors.pop(name, None)
+
+    def _forget_removed(self, data_config: DataConfig, names: set[str]) -> None:
+        # Errors and failures of removed files no longer apply, and would
+        # otherwise pile up with every version of a file that failed.
+        def removed(name: str) -> bool:
+            return _dataset_file(data_config, Path(name)) and name not in names
+
+        with self._lock:
+            for name in [name for name in self._errors if removed(name)]:
+                del self._errors[name]
+        for name in [name for name in self._failed if removed(name)]:
+            del self._failed[name]
+
+    def _files(self, data_config: DataConfig) -> tuple[Path | None, list[Path]]:
+        base = None
+        deltas = []
+        for path in sorted(self.path.iterdir()):
+            if not _dataset_file(data_config, path):
+                continue
+            if path.stem == _dataset_name(data_config):
+                base = path
+            else:
+                deltas.append(path)
+        return base, deltas
+
+    def _fingerprint(self, path: Path, data_config: DataConfig) -> str:
+        # Files are replaced rather than edited in place, so the size and time
+        # of the last change identify the content without reading it.
+        stat = path.stat()
+        fingerprint = hashlib.blake2b(digest_size=16)
+        fingerprint.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        fingerprint.update(repr(data_config.columns).encode())
+        return fingerprint.hexdigest()
+
+    def _read(
+        self, path: Path, file_id: str, data_config: DataConfig
+    ) -> pd.DataFrame | None:
+        # Validated frames are kept as Arrow files, which load with their dtypes
+        # in a fraction of the time it takes to parse and check the source. As
+        # with spilled datasets, columns needing no conversion stay mapped.
+        cache_file = self.cache_path / f"{data_config.key}.{file_id}.arrow"
+        if cache_file.exists():
+            table = feather.read_table(cache_file, memory_map=True)
+            return table.to_pandas(split_blocks=True, self_destruct=True)
+
+        uploaded_file = io.BytesIO(path.read_bytes())
+        uploaded_file.name = path.name
+        try:
+            df, errors = load_file(uploaded_file, data_config)
+        except Exception as err:
+            errors = [str(err)]
+        self._set_errors(path.name, errors)
+        if errors:
+            self._failed[path.name] = file_id
+            return None
+        self._failed.pop(path.name, None)
+
+        self.cache_path.mkdir(parents=True, exist_ok=True)
+        feather.write_feather(
+            df, cache_file, compression="uncompressed", chunksize=max(len(df), 1)
+        )
+        return df
+
+
+def _dataset_name(data_config: DataConfig) -> str:
+    return data_config.key.removesuffix("_data")
+
+
+def _dataset_file(data_config: DataConfig, path: Path) -> bool:
+    name = _dataset_name(data_config)
+    return path.suffix in FILE_SUFFIXES and (
+        path.stem == name or path.stem.startswith(f"{name}-")
+    )
+
+
+def start_data_directory() -> None:
+    # Started by the first page rendered rather than on import, so scripts that
+    # only import the app never start watching the directory.
+    if data_directory is not None:
+        data_directory.start()
+
+
+def attach_directory_data() -> None:
+    # Sessions without data of their own get the directory's, and keep following
+    # it until they upload a file.
+    if data_directory is None:
+        return
+    if not data_directory.ready.is_set():
+        with st.spinner("Завантаження даних із каталогу..."):
+            ready = data_directory.ready.wait(READY_WAIT_SECONDS)
+        if not ready:
+            st.info(
+                "Дані з каталогу сервера ще завантажуються і з'являться після "
+                "оновлення сторінки.",
+                icon="⏳",
+            )
+            return
+
+    for data_config in DATA_CONFIGS:
+        sources = data_directory.sources(data_config)
+        if sources is None:
+            continue
+        if data_config.sources is None or from_data_directory(data_config):
+            if data_config.attach(sources):
+                st.session_state[f"{data_config.key}_directory"] = sources
+
+
+def from_data_directory(data_config: DataConfig) -> bool:
+    sources = data_config.sources
+    return sources is not None and sources == st.session_state.get(
+        f"{data_config.key}_directory"
+    )
+
+
+data_directory = (
+    DataDirectory(
+        Path(settings.data_directory),
+        Path(
+            settings.data_cache_directory
+            or Path(settings.data_directory) / ".shoplytics-cache"
+        ),
+    )
+    if settings.data_directory
+    else None
+)
@@ -1,115 +1,179 @@
+import string
+from dataclasses import dataclass
+
 import numpy as np
 import pandas as pd
 
-from app.data import customers_data, inventory_data, sales_data
-
-
-def generate_sample_sales() -> pd.DataFrame:
-    dates = pd.date_range(start="2024-01-01", end="2024-12-31", freq="D")
-    stores = ["Store A", "Store B", "Store C"]
-    categories = ["Футболки", "Штани", "Сукні", "Куртки"]
-    sizes = ["XS", "S", "M", "L", "XL"]
-    genders = ["Чоловічий", "Жіночий", "Унісекс"]
-    age_groups = ["0-2", "3-6", "7-14", "14+"]
-
-    data = []
-
-    for date in dates:
-        for _ in range(np.random.randint(5, 15)):  # Random number of sales per day
-            store = np.random.choice(stores)
-            product_id = f"P{np.random.randint(1, 1001):04d}"
-            category = np.random.choice(categories)
-            product_name = f"{category} {np.random.randint(1, 100)}"
-            size = np.random.choice(sizes)
-            gender = np.random.choice(genders)
-            age_group = np.random.choice(age_groups)
-
-            quantity = np.random.randint(1, 10)
-            price = np.random.uniform(200.0, 2000.0)
-            cost = price * 0.6  # 40% margin
-            revenue = quantity * price
-
-            data.append(
-                [
-                    date,
-                    store,
-                    product_id,
-                    product_name,
-                    category,
-                    size,
-                    gender,
-                    age_group,
-                    quantity,
-                    price,
-                    cost,
-                    revenue,
-                ]
-            )
-
-    return pd.DataFrame(data, columns=sales_data.column_names)
-
-
-def generate_sample_inventory() -> pd.DataFrame:
-    stores = ["Store A", "Store B", "Store C"]
-    categories = ["Футболки", "Штани", "Сукні", "Куртки"]
-    sizes = ["XS", "S", "M", "L", "XL"]
-
-    data = []
-
-    for store in stores:
-        for category in categories:
-            for size in sizes:
-                product_id = f"P{np.random.randint(1, 1001):04d}"
-                product_name = f"{category} {np.random.randint(1, 100)}"
-                stock_qty = np.random.randint(10, 200)
-                min_qty = np.random.randint(5, 20)
-                last_updated = pd.Timestamp("2024-12-31")
-
-                data.append(
-                    [
-                        store,
-                        product_id,
-                        product_name,
-                        category,
-                        size,
-                        stock_qty,
-                        min_qty,
-                        last_updated,
-                    ]
-                )
-
-    return pd.DataFrame(data, columns=inventory_data.column_names)
-
-
-def generate_sample_customers() -> pd.DataFrame:
-    stores = ["Store A", "Store B", "Store C"]
-    genders = ["Чоловічий", "Жіночий"]
-
-    data = []
-
-    for i in range(1, 101):  # Generate 100 customers
-        customer_id = f"C{i:04d}"
-        age = np.random.randint(18, 70)
-        gender = np.random.choice(genders)
-        start_date = pd.Timestamp("2024-01-01")
-        days_offset = np.random.randint(0, 365)
-        signup_date = start_date + pd.Timedelta(days=days_offset)
-        store = np.random.choice(stores)
-        total_orders = np.random.randint(1, 20)
-        total_spent = np.random.uniform(1000.0, 50000.0)
-        last_purchase_date = signup_date + pd.Timedelta(days=np.random.randint(0, 365))
-
-        data.append(
-            [
-                customer_id,
-                age,
-                gender,
-                signup_date,
-                store,
-                total_orders,
-                total_spent,
-                last_purchase_date,
+from app.data import DataConfig, customers_data, inventory_data, sales_data
+
+CATEGORIES = ["Футболки", "Штани", "Сукні", "Куртки"]
+SIZES = ["XS", "S", "M", "L", "XL"]
+GENDERS = ["Чоловічий", "Жіночий", "Унісекс"]
+AGE_GROUPS = ["0-2", "3-6", "7-14", "14+"]
+CUSTOMER_GENDERS = ["Чоловічий", "Жіночий"]
+
+
+@dataclass(frozen=True)
+class SampleScale:
+    days: int = 366
+    stores: int = 3
+    skus: int = 100
+    customers: int = 100
+    sales_per_store_day: float = 3.5
+    start_date: str = "2024-01-01"
+    seed: int = 42
+
+    @property
+    def dates(self) -> pd.DatetimeIndex:
+        return pd.date_range(start=self.start_date, periods=self.days, freq="D")
+
+    @property
+    def store_names(self) -> list[str]:
+        if self.stores <= len(string.ascii_uppercase):
+            return [
+                f"Store {letter}" for letter in string.ascii_uppercase[: self.stores]
             ]
+        return [f"Store {i:03d}" for i in range(1, self.stores + 1)]
+
+    def rng(self, stream: int) -> np.random.Generator:
+        # Every dataset draws from its own stream, so the output of one generator
+        # does not depend on which generators were called before it.
+        return np.random.default_rng([self.seed, stream])
+
+
+@dataclass(frozen=True)
+class Catalog:
+    product_ids: list[str]
+    product_names: list[str]
+    category_codes: np.ndarray
+    gender_codes: np.ndarray
+    age_group_codes: np.ndarray
+    prices: np.ndarray
+    popularity: np.ndarray
+
+
+def generate_catalog(scale: SampleScale) -> Catalog:
+    rng = scale.rng(0)
+    width = max(4, len(str(scale.skus)))
+    category_codes = rng.integers(0, len(CATEGORIES), scale.skus)
+    popularity = rng.lognormal(sigma=1.0, size=scale.skus)
+    return Catalog(
+        product_ids=[f"P{i:0{width}d}" for i in range(1, scale.skus + 1)],
+        product_names=[
+            f"{CATEGORIES[code]} {i}" for i, code in enumerate(category_codes, 1)
+        ],
+        category_codes=category_codes,
+        gender_codes=rng.integers(0, len(GENDERS), scale.skus),
+        age_group_codes=rng.integers(0, len(AGE_GROUPS), scale.skus),
+        prices=rng.uniform(200.0, 2000.0, scale.skus).round(2),
+        popularity=popularity / popularity.sum(),
+    )
+
+
+def generate_sample_sales(scale: SampleScale = SampleScale()) -> pd.DataFrame:
+    rng = scale.rng(1)
+    catalog = generate_catalog(scale)
+
+    # One cell per (day, store); rows come out ordered by date.
+    sales_per_cell = rng.poisson(scale.sales_per_store_day, scale.days * scale.stores)
+    cells = np.repeat(np.arange(sales_per_cell.size), sales_per_cell)
+    day_codes, store_codes = np.divmod(cells, scale.stores)
+    rows = cells.size
+
+    sku_codes = rng.choice(scale.skus, size=rows, p=catalog.popularity)
+    quantity = rng.integers(1, 10, rows)
+    price = catalog.prices[sku_codes]
+    cost = (price * 0.6).round(2)  # 40% margin
+
+    return _to_frame(
+        {
+            "date": scale.dates[day_codes],
+            "store": _categorical(store_codes, scale.store_names),
+            "product_id": _categorical(sku_codes, catalog.product_ids),
+            "product_name": _categorical(sku_codes, catalog.product_names),
+            "category": _categorical(catalog.category_codes[sku_codes], CATEGORIES),
+            "size": _categorical(rng.integers(0, len(SIZES), rows), SIZES),
+            "gender": _categorical(catalog.gender_codes[sku_codes], GENDERS),
+            "age_group": _categorical(catalog.age_group_codes[sku_codes], AGE_GROUPS),
+            "quantity": quantity,
+            "price": price,
+            "cost": cost,
+            "revenue": quantity * price,
+        },
+        sales_data,
+    )
+
+
+def generate_sample_inventory(scale: SampleScale = SampleScale()) -> pd.DataFrame:
+    rng = scale.rng(2)
+    catalog = generate_catalog(scale)
+
+    # Every product is stocked in every size in every store.
+    store_codes, sku_codes, size_codes = (
+        grid.ravel()
+        for grid in np.meshgrid(
+            np.arange(scale.stores),
+            np.arange(scale.skus),
+            np.arange(len(SIZES)),
+            indexing="ij",
         )
-
-    return pd.DataFrame(data, columns=customers_data.column_names)
+    )
+    rows = store_codes.size
+
+    return _to_frame(
+        {
+            "store": _categorical(store_codes, scale.store_names),
+            "product_id": _categorical(sku_codes, catalog.product_ids),
+            "product_name": _categorical(sku_codes, catalog.product_names),
+            "category": _categorical(catalog.category_codes[sku_codes], CATEGORIES),
+            "size": _categorical(size_codes, SIZES),
+            "stock_qty": rng.integers(0, 200, rows),
+            "min_qty": rng.integers(5, 20, rows),
+            "last_updated": np.full(rows, scale.dates[-1]),
+        },
+        inventory_data,
+    )
+
+
+def generate_sample_customers(scale: SampleScale = SampleScale()) -> pd.DataFrame:
+    rng = scale.rng(3)
+    catalog = generate_catalog(scale)
+    rows = scale.customers
+    width = max(4, len(str(rows)))
+
+    # Customers sign up and buy within the generated sales period.
+    signup_days = rng.integers(0, scale.days, rows)
+    last_purchase_days = rng.integers(signup_days, scale.days)
+    total_orders = rng.integers(1, 20, rows)
+    average_check = catalog.prices.mean() * 5
+    total_spent = total_orders * average_check * rng.uniform(0.5, 1.5, rows)
+
+    return _to_frame(
+        {
+            "customer_id": [f"C{i:0{width}d}" for i in range(1, rows + 1)],
+            "age": rng.integers(18, 70, rows),
+            "gender": _categorical(
+                rng.integers(0, len(CUSTOMER_GENDERS), rows), CUSTOMER_GENDERS
+            ),
+            "signup_date": scale.dates[signup_days],
+            "store": _categorical(
+                rng.integers(0, scale.stores, rows), scale.store_names
+            ),
+            "total_orders": total_orders,
+            "total_spent": total_spent.round(2),
+            "last_purchase_date": scale.dates[last_purchase_days],
+        },
+        customers_data,
+    )
+
+
+def _to_frame(columns: dict, data_config: DataConfig) -> pd.DataFrame:
+    # Generated values always fit, so the frame gets the narrow types the
+    # loader gives the same columns after validation.
+    return pd.DataFrame(
+        {col_name: columns[col_name] for col_name in data_config.column_names}
+    ).astype(data_config.numeric_dtypes)
+
+
+def _categorical(codes: np.ndarray, categories: list[str]) -> pd.Categorical:
+    return pd.Categorical.from_codes(codes, categories=categories)
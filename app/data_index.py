@@ -0,0 +1,199 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Collection, TypeAlias
+
+import numpy as np
+import pandas as pd
+
+Conditions: TypeAlias = dict[str, Collection[str] | None]
+DateRange: TypeAlias = tuple[date, date]
+Rows: TypeAlias = slice | np.ndarray
+
+
+@dataclass(frozen=True)
+class ColumnIndex:
+    categories: pd.Index
+    # Category codes shifted by one, so missing values land in bucket 0.
+    buckets: np.ndarray
+    # Row positions grouped by bucket and ascending within each bucket, so the
+    # rows of bucket k are positions[offsets[k] : offsets[k + 1]].
+    positions: np.ndarray
+    offsets: np.ndarray
+
+    @classmethod
+    def build(cls, series: pd.Series) -> "ColumnIndex":
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype("category")
+
+        categories = series.cat.categories
+        buckets = series.cat.codes.to_numpy() + 1
+        buckets = buckets.astype(np.min_scalar_type(len(categories)))
+        position_dtype = np.int32 if len(series) < np.iinfo(np.int32).max else np.int64
+        return cls(
+            categories=categories,
+            buckets=buckets,
+            positions=np.argsort(buckets, kind="stable").astype(position_dtype),
+            offsets=np.concatenate(
+                [[0], np.bincount(buckets, minlength=len(categories) + 1).cumsum()]
+            ),
+        )
+
+    def selected_buckets(self, values: Collection[str]) -> np.ndarray:
+        codes = self.categories.get_indexer(list(values))
+        return np.unique(codes[codes >= 0]) + 1
+
+    def bucket_rows(self, bucket: int, start: int, stop: int) -> np.ndarray:
+        rows = self.positions[self.offsets[bucket] : self.offsets[bucket + 1]]
+        if start == 0 and stop == len(self.buckets):
+            return rows
+        return rows[np.searchsorted(rows, start) : np.searchsorted(rows, stop)]
+
+    def count(self, values: Collection[str], start: int, stop: int) -> int:
+        buckets = self.selected_buckets(values)
+        if start == 0 and stop == len(self.buckets):
+            return int((self.offsets[buckets + 1] - self.offsets[buckets]).sum())
+        return sum(len(self.bucket_rows(bucket, start, stop)) for bucket in buckets)
+
+    def rows(self, values: Collection[str], start: int, stop: int) -> np.ndarray:
+        rows = [
+            self.bucket_rows(bucket, start, stop)
+            for bucket in self.selected_buckets(values)
+        ]
+        if not rows:
+            return np.empty(0, dtype=self.positions.dtype)
+        return np.sort(np.concatenate(rows))
+
+    def contains(self, values: Collection[str], rows: np.ndarray) -> np.ndarray:
+        lookup = np.zeros(len(self.categories) + 1, dtype=bool)
+        lookup[self.selected_buckets(values)] = True
+        return lookup[self.buckets[rows]]
+
+
+@dataclass(frozen=True)
+class DateIndex:
+    column: str
+    first_day: np.datetime64
+    # Rows of day first_day + k are day_offsets[k] : day_offsets[k + 1].
+    day_offsets: np.ndarray
+
+    @classmethod
+    def build(cls, series: pd.Series) -> "DateIndex | None":
+        # Only a column the frame is sorted by can be sliced by position.
+        if (
+            series.empty
+            or series.dtype.kind != "M"
+            or series.hasnans
+            or not series.is_monotonic_increasing
+        ):
+            return None
+
+        days = series.to_numpy().astype("datetime64[D]")
+        return cls(
+            column=series.name,
+            first_day=days[0],
+            day_offsets=np.searchsorted(days, np.arange(days[0], days[-1] + 2)),
+        )
+
+    def bounds(self, date_range: DateRange) -> tuple[int, int]:
+        start, end = (np.datetime64(day, "D") for day in date_range)
+        last = len(self.day_offsets) - 1
+        first_offset, end_offset = (
+            np.clip((day - self.first_day).astype(int), 0, last)
+            for day in (start, end + 1)
+        )
+        first_row = self.day_offsets[first_offset]
+        return first_row, max(first_row, self.day_offsets[end_offset])
+
+
+class DimensionIndex:
+    def __init__(
+        self,
+        columns: dict[str, ColumnIndex],
+        dates: DateIndex | None,
+        labels: pd.Index,
+    ) -> None:
+        self.columns = columns
+        self.dates = dates
+        # Row labels of the indexed frame. Positions are only valid for frames
+        # sharing this exact object: the frame itself, its full slices, and
+        # frames built from it that keep it on purpose.
+        self.labels = labels
+        self.size = len(labels)
+
+    @classmethod
+    def build(
+        cls, df: pd.DataFrame, columns: list[str], date_column: str | None = None
+    ) -> "DimensionIndex":
+        return cls(
+            {col_name: ColumnIndex.build(df[col_name]) for col_name in columns},
+            DateIndex.build(df[date_column]) if date_column else None,
+            df.index,
+        )
+
+    def answers(
+        self, df: pd.DataFrame, conditions: Conditions, date_column: str | None
+    ) -> bool:
+        return (
+            df.index is self.labels
+            and all(
+                col_name in self.columns
+                for col_name, values in conditions.items()
+                if values is not None
+            )
+            and (
+                date_column is None
+                or (self.dates is not None and self.dates.column == date_column)
+            )
+        )
+
+    def find_rows(
+        self, conditions: Conditions, date_range: DateRange | None = None
+    ) -> Rows:
+        # A date range narrows the search to one contiguous block of rows.
+        start, stop = 0, self.size
+        if date_range is not None:
+            start, stop = self.dates.bounds(date_range)
+
+        # Conditions that keep every row in the block are skipped.
+        counts = {
+            col_name: self.columns[col_name].count(values, start, stop)
+            for col_name, values in conditions.items()
+            if values is not None
+        }
+        active = [
+            col_name for col_name, count in counts.items() if count < stop - start
+        ]
+        if not active:
+            return slice(start, stop)
+
+        # Only the most selective condition touches its index; the others are
+        # checked on its rows, so the cost follows the size of the result.
+        active.sort(key=counts.get)
+        rows = self.columns[active[0]].rows(conditions[active[0]], start, stop)
+        for col_name in active[1:]:
+            rows = rows[self.columns[col_name].contains(conditions[col_name], rows)]
+        return rows
+
+
+def select_rows(
+    df: pd.DataFrame,
+    conditions: Conditions,
+    index: DimensionIndex | None = None,
+    date_range: DateRange | None = None,
+    date_column: str = "date",
+) -> pd.DataFrame:
+    date_range = date_range or None
+    if index is not None and index.answers(
+        df, conditions, date_column if date_range else None
+    ):
+        return df.iloc[index.find_rows(conditions, date_range)]
+
+    mask = pd.Series(True, index=df.index)
+    for col_name, values in conditions.items():
+        if values is not None:
+            mask &= df[col_name].isin(values)
+    if date_range is not None:
+        start, end = (pd.Timestamp(day) for day in date_range)
+        dates = df[date_column]
+        mask &= (dates >= start) & (dates < end + pd.Timedelta(days=1))
+    return df[mask]
@@ -0,0 +1,161 @@
+import io
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, TypeAlias
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from app.data import DataConfig
+from app.data_validator import DataValidator, Violation, merge_violations
+from app.settings import settings
+
+ProgressCallback: TypeAlias = Callable[[float], None]
+LoadResult: TypeAlias = tuple[pd.DataFrame | None, list[str]]
+
+CHUNK_SIZE = 100_000
+NO_ROWS_ERROR = "Файл не містить жодного рядка даних"
+
+# Separate from the column pool, so file tasks waiting on column checks can never
+# starve them of threads.
+file_executor = ThreadPoolExecutor(
+    max_workers=settings.worker_threads, thread_name_prefix="file-loading"
+)
+
+
+@dataclass
+class LoadTask:
+    future: Future[LoadResult] = field(default_factory=Future)
+    progress: float = 0.0
+
+    @classmethod
+    def completed(cls, result: LoadResult) -> "LoadTask":
+        task = cls(progress=1.0)
+        task.future.set_result(result)
+        return task
+
+    def report_progress(self, progress: float) -> None:
+        self.progress = progress
+
+
+def load_file(
+    uploaded_file: io.BytesIO,
+    data_config: DataConfig,
+    chunk_size: int = CHUNK_SIZE,
+    on_progress: ProgressCallback | None = None,
+) -> LoadResult:
+    if uploaded_file.name.endswith(".csv"):
+        df, errors = _load_csv(uploaded_file, data_config, chunk_size, on_progress)
+    elif uploaded_file.name.endswith(".xlsx"):
+        df, errors = _load_excel(uploaded_file, data_config, on_progress)
+    else:
+        raise ValueError("Непідтримуваний формат файлу")
+
+    if df is not None:
+        df = sort_rows(df, data_config)
+    return df, errors
+
+
+def sort_rows(df: pd.DataFrame, data_config: DataConfig) -> pd.DataFrame:
+    # Sorting happens after validation, so reported row numbers match the file.
+    sort_by = data_config.sort_by
+    if sort_by is None or df[sort_by].is_monotonic_increasing:
+        return df
+    return df.sort_values(sort_by, kind="stable", ignore_index=True)
+
+
+def submit_load(
+    uploaded_file: io.BytesIO,
+    data_config: DataConfig,
+    chunk_size: int = CHUNK_SIZE,
+) -> LoadTask:
+    task = LoadTask()
+    task.future = file_executor.submit(
+        load_file,
+        uploaded_file,
+        data_config,
+        chunk_size,
+        on_progress=task.report_progress,
+    )
+    return task
+
+
+def concat_frames(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    if len(frames) == 1:
+        return frames[0]
+
+    # Each frame has its own categories, so categorical columns are unioned
+    # explicitly, otherwise concatenation would fall back to object dtype.
+    columns = {}
+    for col_name in frames[0].columns:
+        parts = [frame[col_name] for frame in frames]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            columns[col_name] = union_categoricals(parts, sort_categories=True)
+        else:
+            columns[col_name] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def _load_csv(
+    uploaded_file: io.BytesIO,
+    data_config: DataConfig,
+    chunk_size: int,
+    on_progress: ProgressCallback | None,
+) -> LoadResult:
+    file_size = uploaded_file.seek(0, io.SEEK_END) or 1
+    uploaded_file.seek(0)
+
+    # Only the configured columns are parsed, so extra columns never take memory.
+    column_names = set(data_config.column_names)
+    reader = pd.read_csv(
+        uploaded_file,
+        chunksize=chunk_size,
+        usecols=lambda col: col in column_names,
+        dtype={col: "category" for col in data_config.category_columns},
+    )
+
+    chunks: list[pd.DataFrame] = []
+    violations: list[Violation] = []
+    rows = 0
+
+    with reader:
+        for chunk in reader:
+            chunk_violations = DataValidator(chunk, data_config).find_violations()
+            violations = merge_violations(violations, chunk_violations)
+
+            # A missing column makes every following chunk invalid too.
+            if any(violation.fatal for violation in chunk_violations):
+                break
+
+            # Once the file is known to be invalid, parsed rows are no longer needed.
+            if violations:
+                chunks.clear()
+            else:
+                chunks.append(chunk[data_config.column_names])
+                rows += len(chunk)
+
+            if on_progress:
+                on_progress(min(uploaded_file.tell() / file_size, 1.0))
+
+    if violations:
+        return None, [str(violation) for violation in violations]
+    # A file with only the header still yields one empty chunk.
+    if not rows:
+        return None, [NO_ROWS_ERROR]
+    return concat_frames(chunks), []
+
+
+def _load_excel(
+    uploaded_file: io.BytesIO,
+    data_config: DataConfig,
+    on_progress: ProgressCallback | None,
+) -> LoadResult:
+    df = pd.read_excel(uploaded_file)
+    errors = DataValidator(df, data_config).validate()
+    if on_progress:
+        on_progress(1.0)
+    if errors:
+        return None, errors
+    if df.empty:
+        return None, [NO_ROWS_ERROR]
+    return df[data_config.column_names], errors
@@ -0,0 +1,285 @@
+import os
+import tempfile
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Hashable, TypeVar
+
+import numpy as np
+import pandas as pd
+from pyarrow import feather
+
+from app.settings import settings
+
+T = TypeVar("T")
+
+
+class Dataset:
+    # Frames and artifacts here are shared by every session holding the
+    # dataset, so they are never modified in place.
+    def __init__(
+        self, registry: "DatasetRegistry", key: Hashable, df: pd.DataFrame
+    ) -> None:
+        self.registry = registry
+        self.key = key
+        self.derived: dict[str, Any] = {}
+        # Guards the frame and the derived dict; builds run outside of it, each
+        # under its own lock, so one artifact never waits for another.
+        self.lock = threading.RLock()
+        self.references = 0
+        self.last_used = time.monotonic()
+        self.spill_path: Path | None = None
+        self._spill_finalizer: weakref.finalize | None = None
+        self._df: pd.DataFrame | None = df
+        self.frame_size = resident_size(df)
+        self.derived_size = 0
+        self._build_locks: dict[str, threading.Lock] = {}
+        self._builds = 0
+
+    @property
+    def resident_size(self) -> int:
+        frame_size = self.frame_size if self._df is not None else 0
+        return frame_size + self.derived_size
+
+    @property
+    def df(self) -> pd.DataFrame:
+        self.last_used = time.monotonic()
+        df = self._df
+        if df is not None:
+            return df
+
+        with self.lock:
+            if self._df is None:
+                # The spill file is mapped and each column kept in a block of its
+                # own, so numeric, date and category columns without missing
+                # values are used in place, backed by the page cache, while the
+                # rest are converted and their Arrow buffers freed one by one.
+                table = feather.read_table(self.spill_path, memory_map=True)
+                self._df = table.to_pandas(split_blocks=True, self_destruct=True)
+            df = self._df
+        self.registry.enforce_budget(keep=self)
+        return df
+
+    def derive(self, name: str, build: Callable[[pd.DataFrame], T]) -> T:
+        self.last_used = time.monotonic()
+        with self.lock:
+            if name in self.derived:
+                return self.derived[name]
+            build_lock = self._build_locks.setdefault(name, threading.Lock())
+            self._builds += 1
+
+        # Sessions sharing the dataset wait for one build instead of repeating it.
+        try:
+            with build_lock:
+                with self.lock:
+                    if name in self.derived:
+                        return self.derived[name]
+                value = build(self.df)
+                with self.lock:
+                    self.derived[name] = value
+                    self.derived_size += resident_size(value)
+        finally:
+            with self.lock:
+                self._builds -= 1
+        self.registry.enforce_budget(keep=self)
+        return value
+
+    def spill(self, directory: Path) -> bool:
+        # Datasets in use by another thread are left for a later round, and so
+        # are datasets with builds running, whose results would refer to the
+        # frame being dropped.
+        if not self.lock.acquire(blocking=False):
+            return False
+        try:
+            if self._df is None or self._builds:
+                return False
+            if self.spill_path is None:
+                directory.mkdir(parents=True, exist_ok=True)
+                spill_path = directory / f"{uuid.uuid4().hex}.arrow"
+                # One record batch, as columns split into batches are joined
+                # into a copy when read back.
+                feather.write_feather(
+                    self._df,
+                    spill_path,
+                    compression="uncompressed",
+                    chunksize=max(len(self._df), 1),
+                )
+                self.spill_path = spill_path
+                # Removed with the dataset, or when the server exits while the
+                # dataset is still held.
+                self._spill_finalizer = weakref.finalize(
+                    self, spill_path.unlink, missing_ok=True
+                )
+            # Derived artifacts are rebuilt from the frame when next needed.
+            self._df = None
+            self.derived.clear()
+            self.derived_size = 0
+            return True
+        finally:
+            self.lock.release()
+
+    def remove_spill(self) -> None:
+        if self._spill_finalizer is not None:
+            self._spill_finalizer()
+
+
+class DatasetHandle:
+    def __init__(self, registry: "DatasetRegistry", key: Hashable) -> None:
+        self.key = key
+        self.dataset = registry.get(key)
+        # Sessions are dropped without notice, so the reference is also given
+        # back when the session state holding the handle is collected.
+        self._finalizer = weakref.finalize(self, registry.release, key)
+
+    def release(self) -> None:
+        self._finalizer()
+
+
+class DatasetRegistry:
+    def __init__(
+        self, max_idle_bytes: int, memory_budget: int | None, spill_directory: Path
+    ) -> None:
+        self.max_idle_bytes = max_idle_bytes
+        self.memory_budget = memory_budget
+        self.spill_directory = spill_directory
+        self._entries: dict[Hashable, Dataset] = {}
+        # Datasets no session holds, least recently released first.
+        self._idle: OrderedDict[Hashable, int] = OrderedDict()
+        self._idle_bytes = 0
+        # Reentrant, a collected handle can release its dataset at any point.
+        self._lock = threading.RLock()
+        self._stale_spills_removed = False
+
+    @property
+    def used_bytes(self) -> int:
+        with self._lock:
+            return sum(dataset.resident_size for dataset in self._entries.values())
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key: Hashable) -> Dataset:
+        with self._lock:
+            return self._entries[key]
+
+    def acquire(
+        self, key: Hashable, df: pd.DataFrame | None = None
+    ) -> DatasetHandle | None:
+        # The frame is only stored when no session has registered the same
+        # content yet; otherwise the existing one is shared.
+        with self._lock:
+            dataset = self._entries.get(key)
+            if dataset is None:
+                if df is None:
+                    return None
+                dataset = self._entries[key] = Dataset(self, key, df)
+
+            dataset.references += 1
+            if key in self._idle:
+                self._idle_bytes -= self._idle.pop(key)
+            handle = DatasetHandle(self, key)
+        self.enforce_budget(keep=dataset)
+        return handle
+
+    def release(self, key: Hashable) -> None:
+        with self._lock:
+            dataset = self._entries.get(key)
+            if dataset is None:
+                return
+            dataset.references -= 1
+            if dataset.references > 0:
+                return
+
+            self._idle[key] = dataset.resident_size
+            self._idle_bytes += dataset.resident_size
+            while self._idle_bytes > self.max_idle_bytes:
+                self._evict_idle()
+
+    def enforce_budget(self, keep: Dataset | None = None) -> None:
+        if self.memory_budget is None:
+            return
+
+        with self._lock:
+            used_bytes = self.used_bytes
+            # Datasets nobody holds go first, then held ones are moved to disk,
+            # least recently used first. The dataset being used is kept.
+            while used_bytes > self.memory_budget and self._idle:
+                used_bytes -= self._evict_idle()
+
+            if used_bytes <= self.memory_budget:
+                return
+            held = sorted(
+                (
+                    dataset
+                    for dataset in self._entries.values()
+                    if dataset is not keep and dataset.resident_size
+                ),
+                key=lambda dataset: dataset.last_used,
+            )
+            self._remove_stale_spills()
+
+        # Files are written outside of the lock, which every session acquiring
+        # or releasing a dataset would otherwise wait for.
+        for dataset in held:
+            if used_bytes <= self.memory_budget:
+                break
+            resident_size = dataset.resident_size
+            if dataset.spill(self.spill_directory):
+                used_bytes -= resident_size
+
+    def clear(self) -> None:
+        with self._lock:
+            while self._idle:
+                self._evict_idle()
+
+    def _remove_stale_spills(self) -> None:
+        # Left by an earlier run that did not exit cleanly. Done before the
+        # first spill rather than on import, so scripts importing the app never
+        # touch the files of a running server.
+        if self._stale_spills_removed:
+            return
+        self._stale_spills_removed = True
+        for spill_path in self.spill_directory.glob("*.arrow"):
+            spill_path.unlink(missing_ok=True)
+
+    def _evict_idle(self) -> int:
+        key, size = self._idle.popitem(last=False)
+        self._idle_bytes -= size
+        dataset = self._entries.pop(key)
+        dataset.remove_spill()
+        return dataset.resident_size
+
+
+def resident_size(value: Any) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    # Polars frames.
+    if hasattr(value, "estimated_size"):
+        return int(value.estimated_size())
+    if isinstance(value, dict):
+        return sum(resident_size(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(resident_size(item) for item in value)
+    if hasattr(value, "__dict__"):
+        return resident_size(vars(value))
+    return 0
+
+
+dataset_registry = DatasetRegistry(
+    max_idle_bytes=settings.idle_datasets_mb * 1024**2,
+    memory_budget=(
+        settings.memory_budget_mb * 1024**2 if settings.memory_budget_mb else None
+    ),
+    spill_directory=Path(
+        settings.spill_directory
+        or os.path.join(tempfile.gettempdir(), "shoplytics-spill")
+    ),
+)
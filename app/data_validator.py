@@ -1,10 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from typing import Callable, TypeAlias
 
+import numpy as np
 import pandas as pd
 
 from app.data import Column, ColumnType, DataConfig
-
-TypeValidator: TypeAlias = Callable[[str, dict | None], list[str]]
+from app.settings import settings
+
+Check: TypeAlias = tuple[str, pd.Series]
+TypeCoercer: TypeAlias = Callable[
+    [str, pd.Series, pd.Series, dict | None], tuple[pd.Series, list[Check]]
+]
+ColumnResult: TypeAlias = tuple[pd.Series | None, list["Violation"]]
+
+MAX_SAMPLE_ROWS = 5
+
+# Row numbers follow the file, where the first line holds the header.
+FIRST_DATA_ROW = 2
+
+# Column checks are mostly NumPy/pandas work that releases the GIL.
+column_executor = ThreadPoolExecutor(
+    max_workers=settings.worker_threads, thread_name_prefix="validation"
+)
+
+
+@dataclass
+class Violation:
+    message: str
+    count: int = 0
+    rows: list[int] = field(default_factory=list)
+    fatal: bool = False
+
+    def __str__(self) -> str:
+        if not self.count:
+            return self.message
+        rows = ", ".join(str(row) for row in self.rows)
+        if self.count > len(self.rows):
+            rows += ", ..."
+        return f"{self.message} (рядків: {self.count:,}; номери: {rows})"
+
+
+def merge_violations(
+    violations: list[Violation], new_violations: list[Violation]
+) -> list[Violation]:
+    merged = {violation.message: violation for violation in violations}
+    for violation in new_violations:
+        existing = merged.get(violation.message)
+        if existing is None:
+            merged[violation.message] = violation
+            continue
+        existing.count += violation.count
+        existing.rows.extend(violation.rows[: MAX_SAMPLE_ROWS - len(existing.rows)])
+        existing.fatal |= violation.fatal
+    return list(merged.values())
 
 
 class DataValidator:
@@ -13,26 +62,31 @@ class DataValidator:
         self.data_config = data_config
 
     def validate(self) -> list[str]:
-        errors = []
+        return [str(violation) for violation in self.find_violations()]
 
-        # Check for missing columns.
+    def find_violations(self) -> list[Violation]:
+        # Without all columns no rule can be checked reliably.
         missing_columns = self._find_missing_columns()
         if missing_columns:
-            errors.append(f"Відсутні обов'язкові колонки: {', '.join(missing_columns)}")
-
-        # Check for missing values.
-        for col in self._find_columns_with_missing_values():
-            errors.append(f"Знайдено пропущені значення в колонці '{col}'")
-
-        # If we have missing columns and values, no need to continue validation.
-        if errors:
-            return errors
+            return [
+                Violation(
+                    f"Відсутні обов'язкові колонки: {', '.join(missing_columns)}",
+                    fatal=True,
+                )
+            ]
 
-        # Validate each column according to its type and rules.
-        for column in self.data_config.columns:
-            errors.extend(self._validate_column(column))
+        # Columns are checked concurrently, but written back and reported in the
+        # configured order so results do not depend on thread scheduling.
+        columns = self.data_config.columns
+        series = [self.df[col_name] for col_name in self.data_config.column_names]
+        results = column_executor.map(self._validate_column, columns, series)
 
-        return errors
+        violations = []
+        for (col_name, _, _), (coerced, column_violations) in zip(columns, results):
+            if coerced is not None:
+                self.df[col_name] = coerced
+            violations.extend(column_violations)
+        return violations
 
     def _find_missing_columns(self) -> list[str]:
         return [
@@ -41,50 +95,128 @@ class DataValidator:
             if col_name not in self.df.columns
         ]
 
-    def _find_columns_with_missing_values(self) -> list[str]:
-        return [col for col in self.df.columns if self.df[col].isnull().any()]
-
-    def _validate_column(self, column: Column) -> list[str]:
-        type_to_validator: dict[ColumnType, TypeValidator] = {
-            "string": self._validate_string,
-            "numeric": self._validate_numeric,
-            "datetime": self._validate_datetime,
+    def _validate_column(self, column: Column, series: pd.Series) -> ColumnResult:
+        type_to_coercer: dict[ColumnType, TypeCoercer] = {
+            "string": self._coerce_string,
+            "numeric": self._coerce_numeric,
+            "datetime": self._coerce_datetime,
         }
 
         col_name, col_type, rules = column
-        validator = type_to_validator.get(col_type)
-        if not validator:
-            return [f"Невідомий тип колонки '{col_type}' для '{col_name}'"]
-        return validator(col_name, rules)
-
-    def _validate_string(
-        self, column_name: str, rules: dict | None = None
-    ) -> list[str]:
-        errors = []
-        if not self.df[column_name].astype(str).str.strip().notna().all():
-            errors.append(f"Колонка '{column_name}' має містити непорожні значення")
-        return errors
-
-    def _validate_numeric(
-        self, column_name: str, rules: dict | None = None
-    ) -> list[str]:
-        errors = []
-        if not pd.to_numeric(self.df[column_name], errors="coerce").notnull().all():
-            errors.append(f"Колонка '{column_name}' має містити числові значення")
-        elif rules and "min" in rules:
+        coercer = type_to_coercer.get(col_type)
+        if not coercer:
+            return None, [
+                Violation(
+                    f"Невідомий тип колонки '{col_type}' для '{col_name}'", fatal=True
+                )
+            ]
+
+        # Every rule is evaluated as a mask over the single coerced column.
+        missing = series.isna()
+        coerced, checks = coercer(col_name, series, missing, rules)
+        checks.insert(
+            0, (f"Знайдено пропущені значення в колонці '{col_name}'", missing)
+        )
+
+        violations = [
+            violation
+            for message, mask in checks
+            if (violation := self._to_violation(message, mask)) is not None
+        ]
+        return (None if violations else coerced), violations
+
+    def _to_violation(self, message: str, mask: pd.Series) -> Violation | None:
+        positions = np.flatnonzero(mask.to_numpy())
+        if not positions.size:
+            return None
+        rows = self.df.index[positions[:MAX_SAMPLE_ROWS]]
+        return Violation(
+            message,
+            count=int(positions.size),
+            rows=[int(row) + FIRST_DATA_ROW for row in rows],
+        )
+
+    def _coerce_string(
+        self,
+        column_name: str,
+        series: pd.Series,
+        missing: pd.Series,
+        rules: dict | None = None,
+    ) -> tuple[pd.Series, list[Check]]:
+        if rules and rules.get("dtype") == "category":
+            series = series.astype("category")
+
+        # Blank checks on categoricals only look at the distinct values.
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            categories = series.cat.categories.astype(str)
+            blank_codes = np.flatnonzero(categories.str.strip() == "")
+            blank = pd.Series(
+                np.isin(series.cat.codes.to_numpy(), blank_codes), index=series.index
+            )
+        elif series.dtype == object:
+            blank = series.str.strip().eq("").fillna(False).astype(bool)
+        else:
+            blank = pd.Series(False, index=series.index)
+
+        return series, [
+            (f"Колонка '{column_name}' має містити непорожні значення", blank)
+        ]
+
+    def _coerce_numeric(
+        self,
+        column_name: str,
+        series: pd.Series,
+        missing: pd.Series,
+        rules: dict | None = None,
+    ) -> tuple[pd.Series, list[Check]]:
+        coerced = pd.to_numeric(series, errors="coerce")
+        checks = [
+            (
+                f"Колонка '{column_name}' має містити числові значення",
+                coerced.isna() & ~missing,
+            )
+        ]
+        if rules and "min" in rules:
             min_value = rules["min"]
-            if (self.df[column_name] < min_value).any():
-                errors.append(
-                    f"Колонка '{column_name}' має містити значення >= {min_value}"
+            checks.append(
+                (
+                    f"Колонка '{column_name}' має містити значення >= {min_value}",
+                    coerced < min_value,
                 )
-        return errors
-
-    def _validate_datetime(
-        self, column_name: str, rules: dict | None = None
-    ) -> list[str]:
-        errors = []
-        try:
-            self.df[column_name] = pd.to_datetime(self.df[column_name])
-        except ValueError:
-            errors.append(f"Колонка '{column_name}' має неправильний формат дати")
-        return errors
+            )
+        if rules and "dtype" in rules:
+            coerced = _downcast(coerced, np.dtype(rules["dtype"]))
+        return coerced, checks
+
+    def _coerce_datetime(
+        self,
+        column_name: str,
+        series: pd.Series,
+        missing: pd.Series,
+        rules: dict | None = None,
+    ) -> tuple[pd.Series, list[Check]]:
+        date_format = rules.get("format") if rules else None
+        coerced = pd.to_datetime(series, format=date_format, errors="coerce")
+        return coerced, [
+            (
+                f"Колонка '{column_name}' має неправильний формат дати",
+                coerced.isna() & ~missing,
+            )
+        ]
+
+
+def _downcast(series: pd.Series, dtype: np.dtype) -> pd.Series:
+    if series.empty:
+        return series.astype(dtype)
+
+    # Values that the narrower type cannot hold exactly keep the parsed type.
+    if dtype.kind in "iu":
+        info = np.iinfo(dtype)
+        fits = (
+            (series.dtype.kind in "iu" or (series % 1 == 0).all())
+            and series.min() >= info.min
+            and series.max() <= info.max
+        )
+    else:
+        fits = series.abs().max() <= np.finfo(dtype).max
+    return series.astype(dtype) if fits else series
@@ -0,0 +1,137 @@
+import os
+import tempfile
+import weakref
+
+import duckdb
+import pandas as pd
+
+from app.analytics import METRICS, SalesFilters, SalesSummary, sales_conditions
+from app.data import sales_data
+from app.settings import settings
+
+# GROUPING() sets one bit per column left out of a grouping set, with the first
+# of date, store, category and product_name as the highest bit.
+STORE_DAY_SET = 0b0011
+STORE_SET = 0b1011
+CATEGORY_SET = 0b1101
+PRODUCT_SET = 0b1110
+TOTAL_SET = 0b1111
+
+SUMMARY_QUERY = """
+WITH filtered AS (
+    SELECT
+        date_trunc('day', "date") AS "date",
+        store,
+        category,
+        product_name,
+        revenue,
+        cost,
+        quantity
+    FROM sales
+    WHERE {where}
+)
+SELECT
+    GROUPING("date", store, category, product_name) AS grouping_set,
+    "date",
+    store,
+    category,
+    product_name,
+    coalesce(sum(revenue), 0) AS revenue,
+    coalesce(sum(revenue - cost * quantity), 0) AS profit,
+    coalesce(sum(quantity), 0)::BIGINT AS quantity,
+    count(*) AS orders
+FROM filtered
+GROUP BY GROUPING SETS (("date", store), (store), (category), (product_name), ())
+"""
+
+
+def _connect() -> duckdb.DuckDBPyConnection:
+    config = {
+        "threads": settings.worker_threads,
+        # Without a temp directory an in-memory database cannot spill to disk.
+        "temp_directory": settings.duckdb_temp_directory
+        or os.path.join(tempfile.gettempdir(), "shoplytics-duckdb"),
+    }
+    if settings.duckdb_memory_limit:
+        config["memory_limit"] = settings.duckdb_memory_limit
+    return duckdb.connect(config=config)
+
+
+# One in-process database shares its memory limit and threads between sessions;
+# each engine works through its own cursor.
+database = _connect()
+
+
+class DuckDBEngine:
+    def __init__(
+        self,
+        connection: duckdb.DuckDBPyConnection,
+        frames: dict[str, pd.DataFrame],
+    ) -> None:
+        self.connection = connection
+        self.frames = frames
+        # Engines are created on every rerun, and each cursor holds its own
+        # registrations until it is closed.
+        weakref.finalize(self, connection.close)
+
+    @classmethod
+    def for_frames(cls, **frames: pd.DataFrame | None) -> "DuckDBEngine":
+        # Registered frames are scanned in place, nothing is copied into DuckDB.
+        connection = database.cursor()
+        registered = {name: df for name, df in frames.items() if df is not None}
+        for name, df in registered.items():
+            connection.register(name, df)
+        return cls(connection, registered)
+
+    @classmethod
+    def for_session(cls) -> "DuckDBEngine":
+        # Only the sales summary goes through DuckDB; the inventory and
+        # customers pages stay on pandas, so their frames are not registered.
+        return cls.for_frames(sales=sales_data.session_state)
+
+    def summarize_sales(self, filters: SalesFilters) -> SalesSummary:
+        where, params = _sales_where(filters)
+        result = self.connection.execute(SUMMARY_QUERY.format(where=where), params).df()
+
+        def grouping_set(grouping: int, columns: list[str]) -> pd.DataFrame:
+            rows = self._with_source_dtypes(
+                result[result["grouping_set"] == grouping],
+                "sales",
+                {column: column for column in columns},
+            )
+            return rows.set_index(columns)[[*METRICS, "orders"]].sort_index()
+
+        per_store_day = grouping_set(STORE_DAY_SET, ["date", "store"])
+        totals = result[result["grouping_set"] == TOTAL_SET].iloc[0]
+        return SalesSummary(
+            totals={column: totals[column] for column in [*METRICS, "orders"]},
+            daily=per_store_day[METRICS].groupby(level="date").sum(),
+            by_store=grouping_set(STORE_SET, ["store"])[METRICS],
+            by_category=grouping_set(CATEGORY_SET, ["category"])[METRICS],
+            by_product=grouping_set(PRODUCT_SET, ["product_name"])[METRICS],
+            average_check=(per_store_day["revenue"] / per_store_day["orders"]).mean(),
+        )
+
+    def _with_source_dtypes(
+        self, df: pd.DataFrame, table: str, columns: dict[str, str]
+    ) -> pd.DataFrame:
+        # DuckDB returns enums as ordered categoricals and its own time units.
+        source_df = self.frames[table]
+        return df.astype(
+            {column: source_df[source].dtype for column, source in columns.items()}
+        )
+
+
+def _sales_where(filters: SalesFilters) -> tuple[str, list]:
+    clauses, params = ["TRUE"], []
+    for column, values in sales_conditions(filters).items():
+        if values is not None:
+            clauses.append(f'list_contains(?::VARCHAR[], "{column}"::VARCHAR)')
+            params.append(list(values))
+    if filters.date_range:
+        start, end = (pd.Timestamp(day) for day in filters.date_range)
+        clauses.append('"date" >= ? AND "date" < ?')
+        params.extend(
+            [start.to_pydatetime(), (end + pd.Timedelta(days=1)).to_pydatetime()]
+        )
+    return " AND ".join(clauses), params
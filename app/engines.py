@@ -0,0 +1,86 @@
+import importlib.util
+from typing import Literal, Protocol, TypeAlias
+
+import streamlit as st
+
+from app.analytics import (
+    SalesCube,
+    SalesFilters,
+    SalesSummary,
+    build_sales_cube,
+    cube_view,
+    summarize_sales,
+)
+from app.data import sales_data
+from app.settings import settings
+
+EngineName: TypeAlias = Literal["pandas", "duckdb", "polars"]
+
+ENGINE_LABELS: dict[EngineName, str] = {
+    "pandas": "pandas",
+    "duckdb": "DuckDB",
+    "polars": "Polars",
+}
+ENGINE_KEY = "engine"
+
+
+class Engine(Protocol):
+    # Engines answer the aggregations that scan whole datasets. Row listings are
+    # always sliced from the pandas frames, so they look the same everywhere.
+    def summarize_sales(self, filters: SalesFilters) -> SalesSummary: ...
+
+
+class PandasEngine:
+    def __init__(self, sales_cube: SalesCube | None) -> None:
+        self.sales_cube = sales_cube
+
+    @classmethod
+    def for_session(cls) -> "PandasEngine":
+        if sales_data.session_state is None:
+            return cls(None)
+        return cls(sales_data.derive("cube", build_sales_cube))
+
+    def summarize_sales(self, filters: SalesFilters) -> SalesSummary:
+        return summarize_sales(
+            cube_view(self.sales_cube, filters),
+            cube_view(self.sales_cube, filters, by_product=True),
+        )
+
+
+def available_engines() -> list[EngineName]:
+    return [
+        name
+        for name in ENGINE_LABELS
+        if name == "pandas" or importlib.util.find_spec(name) is not None
+    ]
+
+
+def select_engine() -> Engine:
+    engines = available_engines()
+    selected = st.session_state.get(ENGINE_KEY, settings.engine)
+    if selected not in engines:
+        selected = "pandas"
+
+    if len(engines) > 1:
+        selected = st.sidebar.selectbox(
+            "Рушій обчислень",
+            options=engines,
+            index=engines.index(selected),
+            format_func=ENGINE_LABELS.get,
+            help="Усі рушії дають однакові результати",
+        )
+        st.session_state[ENGINE_KEY] = selected
+    return create_engine(selected)
+
+
+def create_engine(name: EngineName) -> Engine:
+    # Imported lazily, DuckDB and Polars are optional dependencies.
+    if name == "duckdb":
+        from app.duckdb_engine import DuckDBEngine
+
+        return DuckDBEngine.for_session()
+    if name == "polars":
+        from app.polars_engine import PolarsEngine
+
+        return PolarsEngine.for_session()
+    return PandasEngine.for_session()
@@ -0,0 +1,87 @@
+import importlib.util
+import io
+from typing import Literal, TypeAlias
+
+import pandas as pd
+import streamlit as st
+
+ExportFormat: TypeAlias = Literal["csv", "csv.gz", "parquet", "xlsx"]
+
+EXPORT_FORMATS: dict[ExportFormat, tuple[str, str]] = {
+    "csv": ("CSV", "text/csv"),
+    "csv.gz": ("CSV (gzip)", "application/gzip"),
+    "parquet": ("Parquet", "application/vnd.apache.parquet"),
+    "xlsx": (
+        "Excel",
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ),
+}
+CSV_CHUNK_ROWS = 100_000
+# Excel sheets hold 1,048,576 rows including the header.
+EXCEL_MAX_ROWS = 1_048_575
+
+
+def available_formats() -> list[ExportFormat]:
+    return [
+        export_format
+        for export_format in EXPORT_FORMATS
+        if export_format != "xlsx" or importlib.util.find_spec("xlsxwriter") is not None
+    ]
+
+
+def export_data(df: pd.DataFrame, export_format: ExportFormat) -> io.BytesIO:
+    # Every format is written straight to the buffer, so the whole file never
+    # exists as a string next to its encoded bytes.
+    buffer = io.BytesIO()
+    if export_format in ("csv", "csv.gz"):
+        df.to_csv(
+            buffer,
+            index=False,
+            chunksize=CSV_CHUNK_ROWS,
+            compression=(
+                {"method": "gzip", "compresslevel": 6, "mtime": 0}
+                if export_format == "csv.gz"
+                else None
+            ),
+        )
+    elif export_format == "parquet":
+        df.to_parquet(buffer, index=False, compression="zstd")
+    elif export_format == "xlsx":
+        # Not in constant memory mode: pandas writes column by column, and that
+        # mode drops every cell sent after its row was flushed.
+        with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
+            df.to_excel(writer, index=False)
+    return buffer
+
+
+def export_button(
+    df: pd.DataFrame, file_name: str, key: str, help: str | None = None
+) -> None:
+    format_col, button_col = st.columns([1, 3], vertical_alignment="bottom")
+    export_format = format_col.selectbox(
+        "Формат",
+        options=available_formats(),
+        format_func=lambda export_format: EXPORT_FORMATS[export_format][0],
+        key=f"{key}_format",
+    )
+    if export_format == "xlsx" and len(df) > EXCEL_MAX_ROWS:
+        button_col.warning(
+            f"Excel вміщує не більше {EXCEL_MAX_ROWS:,} рядків, оберіть інший формат",
+            icon="⚠️",
+        )
+        return
+
+    # The file is only built on request and is not kept for later reruns.
+    if not button_col.button("📥 Експортувати", key=f"{key}_prepare", help=help):
+        return
+    with st.spinner("Підготовка файлу..."):
+        data = export_data(df, export_format)
+    label, mime = EXPORT_FORMATS[export_format]
+    st.download_button(
+        f"💾 Завантажити {label}",
+        data,
+        f"{file_name}.{export_format}",
+        mime,
+        key=f"{key}_download",
+        on_click="ignore",
+    )
@@ -1,8 +1,13 @@
+import sys
 from dataclasses import dataclass
 
 import streamlit as st
 from streamlit.commands.page_config import Layout
 
+from app.data_directory import attach_directory_data, start_data_directory
+from app.profiling import profile_page, profile_requested
+from app.timing import start_rerun
+
 
 @dataclass
 class Page:
@@ -13,6 +18,9 @@ class Page:
     layout: Layout = "wide"
 
     def render(self) -> None:
+        if profile_requested():
+            profile_page(sys._getframe(1).f_globals["__file__"], self.url)
+
         st.set_page_config(
             page_title=f"{self.title} | Shoplytics",
             page_icon=self.icon,
@@ -20,6 +28,10 @@ class Page:
         )
         st.title(f"{self.icon} {self.title}")
         st.markdown(self.description)
+        start_rerun(self.title)
+        # Any page can be the first one opened, so each starts the watcher.
+        start_data_directory()
+        attach_directory_data()
 
 
 home_page = Page(
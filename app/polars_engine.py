@@ -0,0 +1,106 @@
+import os
+
+from app.settings import settings
+
+# Polars sizes its thread pool once, when it is first imported.
+os.environ.setdefault("POLARS_MAX_THREADS", str(settings.worker_threads))
+
+import pandas as pd
+import polars as pl
+
+from app.analytics import METRICS, SalesFilters, SalesSummary, sales_conditions
+from app.data import sales_data
+
+
+class PolarsEngine:
+    def __init__(
+        self, frames: dict[str, pl.DataFrame], dtypes: dict[str, pd.Series]
+    ) -> None:
+        self.frames = frames
+        self.dtypes = dtypes
+
+    @classmethod
+    def for_frames(cls, **frames: pd.DataFrame | None) -> "PolarsEngine":
+        loaded = {name: df for name, df in frames.items() if df is not None}
+        return cls(
+            {name: pl.from_pandas(df) for name, df in loaded.items()},
+            {name: df.dtypes for name, df in loaded.items()},
+        )
+
+    @classmethod
+    def for_session(cls) -> "PolarsEngine":
+        # Only sales are queried, so the other datasets are not copied. The
+        # conversion is kept with the dataset's other derived artifacts, so only
+        # a new upload pays for it.
+        sales_df = sales_data.session_state
+        if sales_df is None:
+            return cls({}, {})
+        return cls(
+            {"sales": sales_data.derive("polars", pl.from_pandas)},
+            {"sales": sales_df.dtypes},
+        )
+
+    def summarize_sales(self, filters: SalesFilters) -> SalesSummary:
+        filtered = (
+            self.frames["sales"]
+            .lazy()
+            .filter(_sales_predicate(filters))
+            .select(
+                pl.col("date").dt.truncate("1d"),
+                "store",
+                "category",
+                "product_name",
+                pl.col("revenue"),
+                profit=pl.col("revenue") - pl.col("cost") * pl.col("quantity"),
+                quantity=pl.col("quantity").cast(pl.Int64),
+                orders=pl.lit(1, dtype=pl.Int64),
+            )
+        )
+        measures = [pl.col(column).sum() for column in [*METRICS, "orders"]]
+
+        # Every breakdown reads the same filtered scan, which Polars shares
+        # between the queries when they are collected together.
+        per_store_day, by_category, by_product, totals = pl.collect_all(
+            [
+                filtered.group_by("date", "store").agg(measures),
+                filtered.group_by("category").agg(measures),
+                filtered.group_by("product_name").agg(measures),
+                filtered.select(measures),
+            ]
+        )
+
+        per_store_day = self._breakdown(per_store_day, ["date", "store"])
+        totals = totals.row(0, named=True)
+        return SalesSummary(
+            totals={column: totals[column] for column in [*METRICS, "orders"]},
+            daily=per_store_day[METRICS].groupby(level="date").sum(),
+            by_store=per_store_day[METRICS].groupby(level="store", observed=True).sum(),
+            by_category=self._breakdown(by_category, ["category"])[METRICS],
+            by_product=self._breakdown(by_product, ["product_name"])[METRICS],
+            average_check=(per_store_day["revenue"] / per_store_day["orders"]).mean(),
+        )
+
+    def _breakdown(self, df: pl.DataFrame, columns: list[str]) -> pd.DataFrame:
+        # Categories come back in order of appearance, and pandas treats such
+        # dtypes as equal to the source ones, so they go through strings.
+        sales_dtypes = self.dtypes["sales"]
+        return (
+            df.with_columns(pl.col(pl.Categorical).cast(pl.String))
+            .to_pandas()
+            .astype({column: sales_dtypes[column] for column in columns})
+            .set_index(columns)
+            .sort_index()
+        )
+
+
+def _sales_predicate(filters: SalesFilters) -> pl.Expr:
+    predicate = pl.lit(True)
+    for column, values in sales_conditions(filters).items():
+        if values is not None:
+            predicate &= pl.col(column).is_in(list(values))
+    if filters.date_range:
+        start, end = (pd.Timestamp(day) for day in filters.date_range)
+        predicate &= (pl.col("date") >= start) & (
+            pl.col("date") < end + pd.Timedelta(days=1)
+        )
+    return predicate
@@ -0,0 +1,98 @@
+import logging
+import threading
+import traceback
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, TypeAlias
+
+import pandas as pd
+import streamlit as st
+
+from app.analytics import build_last_sales, build_sales_cube
+from app.data import DataConfig, customers_data, inventory_data, sales_data
+from app.data_registry import Dataset
+from app.segmentation import add_rfm
+from app.settings import settings
+
+Builders: TypeAlias = dict[str, Callable[[pd.DataFrame], Any]]
+
+logger = logging.getLogger(__name__)
+
+# Artifacts every analytics page derives with its default filters, in the order
+# the pages need them. The sales cube answers the default-filter totals and
+# top products, the last sales the dead-stock join, and the RFM frame the
+# customer segments.
+precomputed: dict[str, Builders] = {
+    sales_data.key: {
+        "index": sales_data.build_index,
+        "cube": build_sales_cube,
+        "last_sales": build_last_sales,
+    },
+    inventory_data.key: {"index": inventory_data.build_index},
+    customers_data.key: {"index": customers_data.build_index, "rfm": add_rfm},
+}
+
+precompute_executor = ThreadPoolExecutor(
+    max_workers=settings.worker_threads, thread_name_prefix="precompute"
+)
+
+
+@dataclass
+class PrecomputeTask:
+    # Weak, so a dataset replaced while the session is on another page is not
+    # kept alive, outside the registry's budget, until the upload page reruns.
+    dataset: weakref.ref[Dataset]
+    future: Future[None] = field(default_factory=Future)
+    cancelled: threading.Event = field(default_factory=threading.Event)
+
+    def cancel(self) -> None:
+        # A build that has already started finishes, but nothing after it runs.
+        self.cancelled.set()
+        self.future.cancel()
+
+
+def precompute(data_config: DataConfig) -> None:
+    # Called on every rerun of the upload page; work only starts when the
+    # session's dataset changed, and the work for the replaced one is dropped.
+    task_key = f"{data_config.key}_precompute"
+    task: PrecomputeTask | None = st.session_state.get(task_key)
+    dataset = data_config.dataset
+    if task is not None and task.dataset() is dataset:
+        return
+    if task is not None:
+        task.cancel()
+        del st.session_state[task_key]
+    if dataset is None:
+        return
+
+    task = PrecomputeTask(weakref.ref(dataset))
+    task.future = precompute_executor.submit(
+        _derive_all, task.dataset, precomputed[data_config.key], task.cancelled
+    )
+    task.future.add_done_callback(_log_failure)
+    st.session_state[task_key] = task
+
+
+def _derive_all(
+    dataset_ref: weakref.ref[Dataset], builders: Builders, cancelled: threading.Event
+) -> None:
+    # A page asking for an artifact that is being built waits for that build
+    # instead of repeating it; other artifacts and the frame stay available.
+    for name, build in builders.items():
+        dataset = dataset_ref()
+        if cancelled.is_set() or dataset is None:
+            return
+        dataset.derive(name, build)
+        del dataset
+
+
+def _log_failure(future: Future[None]) -> None:
+    # Nothing reads the result; pages build a failed artifact again when they
+    # need it, so the error would otherwise go unnoticed.
+    if future.cancelled() or (error := future.exception()) is None:
+        return
+    logger.error("Precomputing derived artifacts failed", exc_info=error)
+    # The traceback's frames hold the dataset, and the future stays in the
+    # session's task.
+    traceback.clear_frames(error.__traceback__)
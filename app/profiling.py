@@ -0,0 +1,179 @@
+import os
+import runpy
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from types import FrameType
+from typing import NoReturn
+
+import pandas as pd
+import streamlit as st
+
+from app.settings import settings
+
+PROFILE_PARAM = "profile"
+PROFILING_KEY = "_profiling"
+SAMPLE_INTERVAL = 0.005
+TOP_ROWS = 30
+
+
+class StackSampler:
+    # Samples the stack of one thread below the page script, so only the
+    # profiled rerun is recorded and other sessions of the server are left out.
+    def __init__(
+        self, thread_id: int, script_path: str, interval: float = SAMPLE_INTERVAL
+    ) -> None:
+        self.thread_id = thread_id
+        self.script_path = script_path
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _sample(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = (
+                collapse_stack(frame, self.script_path) if frame is not None else None
+            )
+            if stack is not None:
+                self.stacks[stack] += 1
+
+
+def collapse_stack(frame: FrameType, script_path: str) -> str | None:
+    # Root first and separated by semicolons, as flamegraph tools expect.
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(
+            f"{code.co_qualname} ({os.path.basename(code.co_filename)}"
+            f":{code.co_firstlineno})"
+        )
+        if code.co_filename == script_path and code.co_name == "<module>":
+            return ";".join(reversed(names))
+        frame = frame.f_back
+    # Samples taken before the script started or after it ended.
+    return None
+
+
+def profile_requested() -> bool:
+    return (
+        settings.profiling
+        and st.query_params.get(PROFILE_PARAM) == "1"
+        and not st.session_state.get(PROFILING_KEY)
+    )
+
+
+def profile_page(script_path: str, name: str) -> NoReturn:
+    # The page script runs once more from the start under the profilers; the
+    # rerun that called this stops after the results, so nothing is drawn twice.
+    # Later reruns are not profiled until the parameter is set again. It is
+    # removed up front: once the page stops, switches pages or fails, changes
+    # to the URL can no longer be sent.
+    del st.query_params[PROFILE_PARAM]
+    sampler = StackSampler(threading.get_ident(), script_path)
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    st.session_state[PROFILING_KEY] = True
+    started = time.perf_counter()
+    sampler.start()
+    try:
+        runpy.run_path(script_path, run_name="__main__")
+    finally:
+        sampler.stop()
+        seconds = time.perf_counter() - started
+        # Tracing covers the whole process: other sessions and background builds
+        # running meanwhile are counted too. Telling them apart would need deep
+        # tracebacks, which slow the rerun down many times over and with it the
+        # stack samples taken at the same time.
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ]
+        )
+        _, peak = tracemalloc.get_traced_memory()
+        if not was_tracing:
+            tracemalloc.stop()
+        st.session_state[PROFILING_KEY] = False
+
+    allocations = snapshot.statistics("lineno")
+
+    with st.sidebar.expander("🔬 Профіль запуску", expanded=True):
+        st.caption(
+            f"Час: {seconds:.2f} с, вибірок: {sampler.stacks.total():,}, "
+            f"пік пам'яті процесу: {peak / 1024**2:,.1f} МБ",
+            help=(
+                "Пік і виділення пам'яті враховують весь сервер, зокрема інші "
+                "сесії та фонові обчислення під час запуску."
+            ),
+        )
+        st.dataframe(
+            function_times(sampler.stacks).head(TOP_ROWS),
+            column_config={
+                "function": "Функція",
+                "total": st.column_config.NumberColumn("Загалом, %", format="%.1f"),
+                "self": st.column_config.NumberColumn("Власний, %", format="%.1f"),
+            },
+            hide_index=True,
+        )
+        st.download_button(
+            "📥 Стеки (flamegraph)",
+            collapsed_stacks(sampler.stacks),
+            f"{name}_stacks.txt",
+            "text/plain",
+            on_click="ignore",
+        )
+        st.download_button(
+            "📥 Виділення пам'яті",
+            allocation_sites(allocations),
+            f"{name}_allocations.txt",
+            "text/plain",
+            on_click="ignore",
+        )
+    st.stop()
+
+
+def function_times(stacks: Counter[str]) -> pd.DataFrame:
+    # Shares of samples in which a function was running itself or was anywhere
+    # on the stack.
+    own: Counter[str] = Counter()
+    total: Counter[str] = Counter()
+    for stack, count in stacks.items():
+        functions = stack.split(";")
+        own[functions[-1]] += count
+        for function in set(functions):
+            total[function] += count
+
+    samples = max(stacks.total(), 1)
+    return pd.DataFrame(
+        {
+            "function": list(total),
+            "total": [count / samples * 100 for count in total.values()],
+            "self": [own[function] / samples * 100 for function in total],
+        }
+    ).sort_values(["total", "self"], ascending=False, ignore_index=True)
+
+
+def collapsed_stacks(stacks: Counter[str]) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def allocation_sites(allocations: list[tracemalloc.Statistic]) -> str:
+    # Memory still held by the end of the rerun, largest sites first.
+    return "# Виділення всього процесу, не лише цієї сторінки\n" + "".join(
+        f"{statistic.size / 1024:,.1f} KiB\t{statistic.count:,}\t"
+        f"{statistic.traceback[0].filename}:{statistic.traceback[0].lineno}\n"
+        for statistic in allocations
+    )
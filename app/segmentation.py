@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+RFM_SCORES = 5
+
+RFM_SEGMENTS = pd.CategoricalDtype(
+    [
+        "Чемпіони",
+        "Лояльні",
+        "Потенційно лояльні",
+        "Нові",
+        "Перспективні",
+        "Потребують уваги",
+        "Під загрозою",
+        "Сплячі",
+        "Втрачені",
+    ]
+)
+
+# Segment codes by recency score (rows) and the combined frequency and
+# monetary score (columns), both from 1 to RFM_SCORES.
+SEGMENT_GRID = np.array(
+    [
+        [8, 7, 7, 6, 6],
+        [8, 7, 7, 6, 6],
+        [5, 5, 5, 1, 1],
+        [4, 2, 2, 1, 0],
+        [3, 2, 2, 0, 0],
+    ],
+    dtype=np.int8,
+)
+
+
+def rfm_scores(
+    df: pd.DataFrame, reference_date: pd.Timestamp | None = None
+) -> pd.DataFrame:
+    # Recency is measured from the latest purchase in the data unless a date
+    # is given, so scores of historical exports do not drift with time.
+    if reference_date is None:
+        reference_date = df["last_purchase_date"].max()
+    recency_days = (reference_date - df["last_purchase_date"]).dt.days.to_numpy()
+
+    return pd.DataFrame(
+        {
+            "recency": RFM_SCORES + 1 - quantile_scores(recency_days),
+            "frequency": quantile_scores(df["total_orders"].to_numpy()),
+            "monetary": quantile_scores(df["total_spent"].to_numpy()),
+        },
+        index=df.index,
+    )
+
+
+def rfm_segments(scores: pd.DataFrame) -> pd.Series:
+    frequency_monetary = (scores["frequency"] + scores["monetary"] + 1) // 2
+    codes = SEGMENT_GRID[scores["recency"] - 1, frequency_monetary - 1]
+    return pd.Series(
+        pd.Categorical.from_codes(codes, dtype=RFM_SEGMENTS),
+        index=scores.index,
+        name="segment",
+    )
+
+
+def add_rfm(
+    df: pd.DataFrame, reference_date: pd.Timestamp | None = None
+) -> pd.DataFrame:
+    scores = rfm_scores(df, reference_date).astype(np.int16)
+    rfm_df = df.assign(
+        rfm_score=scores @ np.array([100, 10, 1], dtype=np.int16),
+        segment=rfm_segments(scores),
+    )
+    # Same rows in the same order, so the index built for the customers frame
+    # keeps answering filters on this one.
+    rfm_df.index = df.index
+    return rfm_df
+
+
+def quantile_scores(values: np.ndarray) -> np.ndarray:
+    # Equal values always share a score, so heavily tied columns such as the
+    # order count may leave some scores unused.
+    if len(values) == 0:
+        return np.empty(0, dtype=np.int8)
+    edges = np.quantile(values, np.linspace(0, 1, RFM_SCORES + 1)[1:-1])
+    return (np.searchsorted(edges, values, side="left") + 1).astype(np.int8)
@@ -0,0 +1,47 @@
+import os
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Settings:
+    upload_cache_mb: int
+    idle_datasets_mb: int
+    memory_budget_mb: int
+    spill_directory: str | None
+    worker_threads: int
+    engine: str
+    chart_points: int
+    timing_panel: bool
+    timing_log: str | None
+    profiling: bool
+    data_directory: str | None
+    data_cache_directory: str | None
+    data_poll_seconds: int
+    duckdb_memory_limit: str | None
+    duckdb_temp_directory: str | None
+
+
+settings = Settings(
+    upload_cache_mb=int(os.environ.get("SHOPLYTICS_UPLOAD_CACHE_MB", "1024")),
+    idle_datasets_mb=int(os.environ.get("SHOPLYTICS_IDLE_DATASETS_MB", "1024")),
+    # Zero keeps every dataset in memory.
+    memory_budget_mb=int(os.environ.get("SHOPLYTICS_MEMORY_BUDGET_MB", "0")),
+    spill_directory=os.environ.get("SHOPLYTICS_SPILL_DIRECTORY"),
+    worker_threads=int(
+        os.environ.get("SHOPLYTICS_WORKER_THREADS", str(os.cpu_count() or 1))
+    ),
+    engine=os.environ.get("SHOPLYTICS_ENGINE", "pandas"),
+    chart_points=int(os.environ.get("SHOPLYTICS_CHART_POINTS", "1000")),
+    timing_panel=os.environ.get("SHOPLYTICS_TIMING_PANEL") == "1",
+    # Section timings are appended to this file as JSON lines.
+    timing_log=os.environ.get("SHOPLYTICS_TIMING_LOG"),
+    # Lets a "?profile=1" query parameter profile one rerun of a page.
+    profiling=os.environ.get("SHOPLYTICS_PROFILING") == "1",
+    # Files in this directory are loaded at startup and shared by every session.
+    data_directory=os.environ.get("SHOPLYTICS_DATA_DIRECTORY"),
+    data_cache_directory=os.environ.get("SHOPLYTICS_DATA_CACHE_DIRECTORY"),
+    # Zero loads the directory once and does not watch it.
+    data_poll_seconds=int(os.environ.get("SHOPLYTICS_DATA_POLL_SECONDS", "60")),
+    duckdb_memory_limit=os.environ.get("SHOPLYTICS_DUCKDB_MEMORY_LIMIT"),
+    duckdb_temp_directory=os.environ.get("SHOPLYTICS_DUCKDB_TEMP_DIRECTORY"),
+)
@@ -0,0 +1,114 @@
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from app.data import DataConfig
+
+PAGE_SIZES = [50, 100, 500, 1000]
+
+
+def paged_table(
+    df: pd.DataFrame,
+    key: str,
+    data_config: DataConfig | None = None,
+    column_config: dict[str, Any] | None = None,
+    **dataframe_kwargs: Any,
+) -> None:
+    # Only the rows of the current page are sorted and sent to the browser;
+    # searching and paging rerun on the server.
+    column_config = column_config or {}
+
+    def label(col_name: str | None) -> str:
+        if col_name is None:
+            return "—"
+        config = column_config.get(col_name, col_name)
+        return config if isinstance(config, str) else config.get("label", col_name)
+
+    search_col, query_col, sort_col, order_col, size_col, page_col = st.columns(
+        [2, 2, 2, 1, 1, 1], vertical_alignment="bottom"
+    )
+    search_column = search_col.selectbox(
+        "Пошук у стовпці",
+        options=[col_name for col_name in df.columns if _is_text(df[col_name])],
+        format_func=label,
+        key=f"{key}_search_column",
+    )
+    query = query_col.text_input("Пошук", key=f"{key}_query")
+    sort_column = sort_col.selectbox(
+        "Сортувати за",
+        options=[None, *df.columns],
+        format_func=label,
+        key=f"{key}_sort_column",
+    )
+    descending = order_col.toggle("За спаданням", key=f"{key}_descending")
+    page_size = size_col.selectbox(
+        "Рядків", options=PAGE_SIZES, index=1, key=f"{key}_page_size"
+    )
+
+    if query and search_column is not None:
+        df = df[search_rows(df[search_column], query)]
+
+    # Filters can shrink the table under the selected page, so it is clamped
+    # before the widget is created.
+    page_count = max(1, -(-len(df) // page_size))
+    page_key = f"{key}_page"
+    st.session_state[page_key] = min(st.session_state.get(page_key, 1), page_count)
+    page = page_col.number_input(
+        "Сторінка", min_value=1, max_value=page_count, step=1, key=page_key
+    )
+
+    start = (page - 1) * page_size
+    stop = min(start + page_size, len(df))
+    page_df = df.loc[sorted_rows(df, sort_column, descending, data_config)[start:stop]]
+    st.dataframe(page_df, column_config=column_config, **dataframe_kwargs)
+    st.caption(f"Рядки {start + 1 if stop else 0}–{stop} з {len(df):,}")
+
+
+def sorted_rows(
+    df: pd.DataFrame,
+    sort_column: str | None,
+    descending: bool,
+    data_config: DataConfig | None = None,
+) -> np.ndarray:
+    if sort_column is None:
+        return df.index.to_numpy()
+
+    # Tables sliced from a loaded dataset keep its row positions as labels, so
+    # the dataset's sort order, computed once, orders any of its subsets.
+    dataset = data_config.session_state if data_config is not None else None
+    if (
+        dataset is not None
+        and sort_column in dataset
+        and dataset.index.equals(pd.RangeIndex(len(dataset)))
+        and df[sort_column].dtype == dataset[sort_column].dtype
+    ):
+        order = data_config.derive(
+            f"order_{sort_column}",
+            lambda dataset: _sort_order(dataset[sort_column]),
+        )
+        selected = np.zeros(len(dataset), dtype=bool)
+        selected[df.index.to_numpy()] = True
+        rows = order[selected[order]]
+    else:
+        rows = _sort_order(df[sort_column], df.index)
+    return rows[::-1] if descending else rows
+
+
+def search_rows(series: pd.Series, query: str) -> pd.Series:
+    # Categories are matched once each instead of once per row.
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        matches = categories[categories.str.contains(query, case=False, regex=False)]
+        return series.isin(matches)
+    return series.astype(str).str.contains(query, case=False, regex=False)
+
+
+def _is_text(series: pd.Series) -> bool:
+    return isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == object
+
+
+def _sort_order(series: pd.Series, labels: pd.Index | None = None) -> np.ndarray:
+    order = series.reset_index(drop=True).sort_values(kind="stable").index.to_numpy()
+    return order if labels is None else labels.to_numpy()[order]
@@ -0,0 +1,117 @@
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Iterator
+
+import pandas as pd
+import streamlit as st
+
+from app.settings import settings
+
+RERUN_KEY = "_timing_rerun"
+
+
+@dataclass
+class Section:
+    name: str
+    rows_in: int | None = None
+    rows_out: int | None = None
+    seconds: float = 0.0
+    memory_delta: int | None = None
+
+
+@dataclass
+class Rerun:
+    page: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    started: float = field(default_factory=time.perf_counter)
+    sections: list[Section] = field(default_factory=list)
+
+
+def timing_enabled() -> bool:
+    return settings.timing_panel or settings.timing_log is not None
+
+
+def start_rerun(page: str) -> None:
+    if not timing_enabled():
+        return
+    st.session_state[RERUN_KEY] = Rerun(page)
+    # Pages can stop at any point, so the panel is reserved at the top and
+    # refilled after every section instead of being drawn at the end.
+    if settings.timing_panel:
+        st.session_state[f"{RERUN_KEY}_panel"] = st.empty()
+
+
+@contextmanager
+def timed(name: str, rows_in: int | None = None) -> Iterator[Section]:
+    # Sections record rows out when the timed code sets them:
+    #     with timed("Фільтрація", rows_in=len(df)) as section:
+    #         df = df[mask]
+    #         section.rows_out = len(df)
+    section = Section(name, rows_in)
+    rerun = st.session_state.get(RERUN_KEY) if timing_enabled() else None
+    if rerun is None:
+        yield section
+        return
+
+    resident_before = _resident_bytes()
+    started = time.perf_counter()
+    try:
+        yield section
+    finally:
+        section.seconds = time.perf_counter() - started
+        resident_after = _resident_bytes()
+        if resident_before is not None and resident_after is not None:
+            section.memory_delta = resident_after - resident_before
+        rerun.sections.append(section)
+        if settings.timing_log is not None:
+            _append_log(rerun, section)
+        if settings.timing_panel:
+            _show_panel(rerun)
+
+
+def _show_panel(rerun: Rerun) -> None:
+    total = time.perf_counter() - rerun.started
+    with st.session_state[f"{RERUN_KEY}_panel"].expander(
+        f"⏱️ Продуктивність: {total:.2f} с"
+    ):
+        sections = pd.DataFrame([asdict(section) for section in rerun.sections])
+        st.dataframe(
+            sections.astype({"rows_in": "Int64", "rows_out": "Int64"}).assign(
+                memory_delta=sections["memory_delta"].astype(float) / 1024**2
+            ),
+            column_config={
+                "name": "Розділ",
+                "rows_in": "Рядків на вході",
+                "rows_out": "Рядків на виході",
+                "seconds": st.column_config.NumberColumn("Час, с", format="%.3f"),
+                "memory_delta": st.column_config.NumberColumn(
+                    "Зміна пам'яті, МБ", format="%.1f"
+                ),
+            },
+            hide_index=True,
+            use_container_width=True,
+        )
+
+
+def _append_log(rerun: Rerun, section: Section) -> None:
+    record = {
+        "time": time.time(),
+        "page": rerun.page,
+        "rerun": rerun.id,
+        **asdict(section),
+    }
+    with open(settings.timing_log, "a", encoding="utf-8") as log:
+        log.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def _resident_bytes() -> int | None:
+    # Only Linux exposes the current resident size without extra packages.
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
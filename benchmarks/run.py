@@ -0,0 +1,550 @@
+import argparse
+import io
+import json
+import platform
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, TypeAlias
+
+import numpy as np
+import pandas as pd
+
+from app import analytics
+from app.analytics import METRICS, CustomerFilters, InventoryFilters, SalesFilters
+from app.data import DataConfig, customers_data, inventory_data, sales_data
+from app.data_generators import (
+    SampleScale,
+    generate_sample_customers,
+    generate_sample_inventory,
+    generate_sample_sales,
+)
+from app.data_delta import merge_delta
+from app.data_index import DimensionIndex
+from app.data_loader import load_file
+from app.data_validator import DataValidator
+from app.engines import (
+    ENGINE_LABELS,
+    Engine,
+    EngineName,
+    PandasEngine,
+    available_engines,
+)
+from app.exports import available_formats, export_data
+from app.segmentation import add_rfm
+
+Context: TypeAlias = dict[str, Any]
+Step: TypeAlias = tuple[str, str, Callable[[Context], Any]]
+Check: TypeAlias = tuple[str, Callable[[Context], None]]
+
+DEFAULT_ROWS = [100_000, 1_000_000, 10_000_000]
+SCALE_DAYS = 730
+SCALE_STORES = 10
+RESULTS_DIR = Path(__file__).parent / "results"
+# Excel is slow to write and read back, so checks run on the first rows only.
+CHECK_ROWS = 2_000
+
+
+@dataclass
+class StepResult:
+    rows: int
+    page: str
+    step: str
+    seconds: float
+    peak_mb: float | None
+
+
+def scale_for_rows(rows: int, seed: int) -> SampleScale:
+    return SampleScale(
+        days=SCALE_DAYS,
+        stores=SCALE_STORES,
+        skus=min(20_000, max(100, rows // 500)),
+        customers=max(100, rows // 10),
+        sales_per_store_day=rows / (SCALE_DAYS * SCALE_STORES),
+        seed=seed,
+    )
+
+
+def prepare_context(
+    scale: SampleScale, with_upload: bool, engine_name: EngineName
+) -> Context:
+    context: Context = {}
+    for name, generate, data_config in [
+        ("sales", generate_sample_sales, sales_data),
+        ("inventory", generate_sample_inventory, inventory_data),
+        ("customers", generate_sample_customers, customers_data),
+    ]:
+        df = generate(scale)
+        if with_upload:
+            context[f"{name}_csv"] = df.to_csv(index=False).encode("utf-8")
+
+        # Page steps run on frames typed the same way as after an upload.
+        DataValidator(df, data_config).validate()
+        context[name] = df
+        context[f"{name}_index"] = build_index(df, data_config)
+
+    context["sales_cube"] = analytics.build_sales_cube(context["sales"])
+    context["last_sales"] = analytics.build_last_sales(context["sales"])
+    context["engine"] = create_engine(engine_name, context)
+    return context
+
+
+def create_engine(engine_name: EngineName, context: Context) -> Engine:
+    if engine_name == "duckdb":
+        from app.duckdb_engine import DuckDBEngine
+
+        return DuckDBEngine.for_frames(sales=context["sales"])
+    if engine_name == "polars":
+        from app.polars_engine import PolarsEngine
+
+        return PolarsEngine.for_frames(sales=context["sales"])
+    return PandasEngine(context["sales_cube"])
+
+
+def upload_step(name: str, data_config: DataConfig) -> Step:
+    def run(context: Context) -> Any:
+        uploaded_file = io.BytesIO(context[f"{name}_csv"])
+        uploaded_file.name = f"{name}.csv"
+        return load_file(uploaded_file, data_config)
+
+    return "upload", f"load_{name}_csv", run
+
+
+def build_index(df: pd.DataFrame, data_config: DataConfig) -> DimensionIndex:
+    return DimensionIndex.build(df, data_config.indexed_columns, data_config.sort_by)
+
+
+def full_period(context: Context) -> analytics.DateRange:
+    dates = context["sales"]["date"]
+    return dates.min().date(), dates.max().date()
+
+
+def all_values(context: Context, dataset: str, column: str) -> tuple[str, ...]:
+    return tuple(context[dataset][column].unique())
+
+
+def sales_page_filters(context: Context) -> SalesFilters:
+    return SalesFilters(
+        date_range=full_period(context),
+        stores=all_values(context, "sales", "store"),
+        categories=all_values(context, "sales", "category"),
+        sizes=all_values(context, "sales", "size"),
+    )
+
+
+UPLOAD_STEPS: list[Step] = [
+    upload_step("sales", sales_data),
+    upload_step("inventory", inventory_data),
+    upload_step("customers", customers_data),
+    (
+        "upload",
+        "build_sales_cube",
+        lambda ctx: analytics.build_sales_cube(ctx["sales"]),
+    ),
+    (
+        "upload",
+        "build_last_sales",
+        lambda ctx: analytics.build_last_sales(ctx["sales"]),
+    ),
+]
+
+PAGE_STEPS: list[Step] = [
+    # Dashboard with its default filters.
+    (
+        "dashboard",
+        "summarize_sales",
+        lambda ctx: ctx["engine"].summarize_sales(
+            SalesFilters(date_range=full_period(ctx))
+        ),
+    ),
+    (
+        "dashboard",
+        "kpis_and_charts",
+        lambda ctx: (
+            ctx["dashboard.summarize_sales"].total("revenue"),
+            ctx["dashboard.summarize_sales"].total("profit"),
+            ctx["dashboard.summarize_sales"].daily_totals("revenue").reset_index(),
+            ctx["dashboard.summarize_sales"].totals_by("store", "revenue"),
+            ctx["dashboard.summarize_sales"].totals_by("category", "revenue"),
+            analytics.inventory_kpis(ctx["inventory"]),
+        ),
+    ),
+    # Sales page with every option selected, as it opens.
+    (
+        "sales",
+        "summarize_sales",
+        lambda ctx: ctx["engine"].summarize_sales(sales_page_filters(ctx)),
+    ),
+    *[
+        (
+            "sales",
+            f"{metric}_metrics_and_charts",
+            lambda ctx, metric=metric: (
+                ctx["sales.summarize_sales"].total(metric),
+                ctx["sales.summarize_sales"].daily_totals(metric).mean(),
+                ctx["sales.summarize_sales"].top_product(metric),
+                ctx["sales.summarize_sales"].top_products(metric),
+                ctx["sales.summarize_sales"].totals_by("category", metric),
+            ),
+        )
+        for metric in METRICS
+    ],
+    (
+        "sales",
+        "details",
+        lambda ctx: analytics.sales_details(
+            analytics.filter_sales(
+                ctx["sales"], sales_page_filters(ctx), ctx["sales_index"]
+            )
+        ),
+    ),
+    *[
+        (
+            "sales",
+            f"export_{export_format.replace('.', '_')}",
+            lambda ctx, export_format=export_format: export_data(
+                ctx["sales.details"], export_format
+            ),
+        )
+        # Excel is left out, it cannot hold the larger row counts.
+        for export_format in available_formats()
+        if export_format != "xlsx"
+    ],
+    # Inventory page with its default filters and sliders.
+    (
+        "inventory",
+        "filter_inventory",
+        lambda ctx: analytics.filter_inventory(
+            ctx["inventory"],
+            InventoryFilters(
+                stores=all_values(ctx, "inventory", "store"),
+                categories=all_values(ctx, "inventory", "category"),
+                sizes=all_values(ctx, "inventory", "size"),
+            ),
+            ctx["inventory_index"],
+        ),
+    ),
+    (
+        "inventory",
+        "kpis_and_chart",
+        lambda ctx: (
+            analytics.inventory_kpis(ctx["inventory.filter_inventory"], 3.0),
+            analytics.stock_by_category(ctx["inventory.filter_inventory"]),
+        ),
+    ),
+    (
+        "inventory",
+        "dead_stock",
+        lambda ctx: analytics.dead_stock_items(
+            ctx["inventory.filter_inventory"], ctx["last_sales"], 30, 3.0
+        ),
+    ),
+    (
+        "inventory",
+        "stock_status",
+        lambda ctx: analytics.stock_status(ctx["inventory.filter_inventory"]),
+    ),
+    (
+        "inventory",
+        "export_csv",
+        lambda ctx: export_data(ctx["inventory.filter_inventory"], "csv"),
+    ),
+    # Customers page with its default filters.
+    ("customers", "rfm", lambda ctx: add_rfm(ctx["customers"])),
+    (
+        "customers",
+        "filter_and_segment",
+        lambda ctx: analytics.add_status_labels(
+            analytics.add_status_flags(
+                analytics.filter_customers(
+                    ctx["customers.rfm"],
+                    CustomerFilters(
+                        stores=all_values(ctx, "customers", "store"),
+                        age_range=(
+                            ctx["customers"]["age"].min(),
+                            ctx["customers"]["age"].max(),
+                        ),
+                    ),
+                    ctx["customers_index"],
+                ),
+                10_000,
+            )
+        ),
+    ),
+    (
+        "customers",
+        "charts",
+        lambda ctx: (
+            ctx["customers.filter_and_segment"]["statuses"].value_counts(),
+            analytics.monthly_signups(ctx["customers.filter_and_segment"]),
+            analytics.inactive_customers(ctx["customers.filter_and_segment"], 60),
+        ),
+    ),
+    (
+        "customers",
+        "export_csv",
+        lambda ctx: export_data(
+            analytics.customers_table(ctx["customers.filter_and_segment"]), "csv"
+        ),
+    ),
+]
+
+
+def check_export_round_trip(context: Context) -> None:
+    df = context["sales"].head(CHECK_ROWS)
+    for export_format in available_formats():
+        buffer = export_data(df, export_format)
+        buffer.seek(0)
+        if export_format == "parquet":
+            result = pd.read_parquet(buffer)
+        elif export_format == "xlsx":
+            result = pd.read_excel(buffer)
+        else:
+            result = pd.read_csv(
+                buffer,
+                compression="gzip" if export_format == "csv.gz" else None,
+                parse_dates=["date"],
+            )
+        pd.testing.assert_frame_equal(
+            result,
+            df,
+            check_dtype=False,
+            check_categorical=False,
+            obj=f"{export_format} export",
+        )
+
+
+def check_timestamped_sales(context: Context) -> None:
+    # Uploaded sales often carry the time of the sale, which must not make the
+    # daily cube grow with the number of sales.
+    rng = np.random.default_rng(0)
+    sales = (
+        context["sales"]
+        .assign(
+            date=context["sales"]["date"]
+            + pd.to_timedelta(rng.integers(0, 86_400, len(context["sales"])), "s")
+        )
+        .sort_values("date", kind="stable", ignore_index=True)
+    )
+    cube = analytics.build_sales_cube(sales)
+    days = sales["date"].dt.normalize()
+    expected_rows = sales.groupby(
+        [days, *analytics.CUBE_DIMENSIONS[1:]], observed=True
+    ).ngroups
+    assert len(cube.products) == expected_rows, (len(cube.products), expected_rows)
+
+    expected = analytics.summarize_sales(sales)
+    filters = SalesFilters(date_range=(days.iloc[0].date(), days.iloc[-1].date()))
+    for engine_name in available_engines():
+        engine = create_engine(engine_name, {**context, "sales": sales})
+        if engine_name == "pandas":
+            engine = PandasEngine(cube)
+        assert_summaries_equal(
+            engine.summarize_sales(filters), expected, f"{engine_name} summary"
+        )
+
+    # A delta inside a day replaces that whole day of the cube. Categories are
+    # unioned when days are spliced, so rows of a day may change their order.
+    delta = sales.iloc[len(sales) // 2 : len(sales) // 2 + 50].assign(quantity=9)
+    merged, window = merge_delta(sales, delta, sales_data)
+    updated = analytics.update_sales_cube(cube, merged, window)
+    pd.testing.assert_frame_equal(
+        cube_rows(updated.products),
+        cube_rows(analytics.build_sales_cube(merged).products),
+        obj="updated cube",
+    )
+
+
+def cube_rows(df: pd.DataFrame) -> pd.DataFrame:
+    dimensions = analytics.CUBE_DIMENSIONS
+    return df.astype({column: str for column in dimensions[1:]}).sort_values(
+        dimensions, ignore_index=True
+    )
+
+
+def assert_summaries_equal(
+    result: analytics.SalesSummary, expected: analytics.SalesSummary, obj: str
+) -> None:
+    for column, value in expected.totals.items():
+        assert np.isclose(result.totals[column], value), (obj, column)
+    assert np.isclose(result.average_check, expected.average_check), obj
+    for field in ["daily", "by_store", "by_category", "by_product"]:
+        pd.testing.assert_frame_equal(
+            getattr(result, field),
+            getattr(expected, field),
+            check_dtype=False,
+            check_index_type=False,
+            check_categorical=False,
+            check_freq=False,
+            obj=f"{obj} {field}",
+        )
+
+
+CHECKS: list[Check] = [
+    ("export_round_trip", check_export_round_trip),
+    ("timestamped_sales", check_timestamped_sales),
+]
+
+
+def run_checks(rows_list: list[int], seed: int) -> bool:
+    passed = True
+    for rows in rows_list:
+        context = prepare_context(scale_for_rows(rows, seed), False, "pandas")
+        for name, check in CHECKS:
+            try:
+                check(context)
+            except AssertionError as err:
+                passed = False
+                print(f"{rows:>12,}  {name:<42} FAILED\n{err}", flush=True)
+            else:
+                print(f"{rows:>12,}  {name:<42} ok", flush=True)
+    return passed
+
+
+def measure(
+    run: Callable[[Context], Any], context: Context, trace_memory: bool
+) -> tuple[Any, float, float | None]:
+    if trace_memory:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    result = run(context)
+    seconds = time.perf_counter() - start
+
+    peak_mb = None
+    if trace_memory:
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1024**2
+        tracemalloc.stop()
+    return result, seconds, peak_mb
+
+
+def run_benchmarks(
+    rows_list: list[int],
+    steps: list[Step],
+    seed: int,
+    trace_memory: bool,
+    engine_name: EngineName,
+) -> list[StepResult]:
+    results = []
+    for rows in rows_list:
+        with_upload = any(page == "upload" for page, _, _ in steps)
+        context = prepare_context(scale_for_rows(rows, seed), with_upload, engine_name)
+
+        for page, name, run in steps:
+            result, seconds, peak_mb = measure(run, context, trace_memory)
+            context[f"{page}.{name}"] = result
+            results.append(StepResult(rows, page, name, seconds, peak_mb))
+            print(format_result(results[-1]), flush=True)
+    return results
+
+
+def format_result(result: StepResult) -> str:
+    peak = f"{result.peak_mb:10.1f} MB" if result.peak_mb is not None else ""
+    step = f"{result.page}.{result.step}"
+    return f"{result.rows:>12,}  {step:<42} {result.seconds:9.3f} s {peak}"
+
+
+def compare(results: list[StepResult], baseline_path: Path) -> None:
+    baseline = {
+        (item["rows"], item["page"], item["step"]): item
+        for item in json.loads(baseline_path.read_text())["results"]
+    }
+
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        previous = baseline.get((result.rows, result.page, result.step))
+        if previous is None:
+            continue
+        ratio = result.seconds / previous["seconds"] if previous["seconds"] else np.nan
+        step = f"{result.page}.{result.step}"
+        print(
+            f"{result.rows:>12,}  {step:<42} "
+            f"{previous['seconds']:9.3f} s -> {result.seconds:9.3f} s  ({ratio:.2f}x)"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the computations behind every Shoplytics page."
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=DEFAULT_ROWS,
+        help="Approximate sales row counts to benchmark",
+    )
+    parser.add_argument(
+        "--pages",
+        nargs="+",
+        choices=["upload", "dashboard", "sales", "inventory", "customers"],
+        help="Only run the steps of these pages",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=list(ENGINE_LABELS),
+        default="pandas",
+        help="Engine answering the sales aggregations",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="Skip peak memory tracing, which slows down Python-heavy steps",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=RESULTS_DIR / f"{datetime.now():%Y%m%d_%H%M%S}.json",
+    )
+    parser.add_argument(
+        "--compare", type=Path, help="Previous results file to compare with"
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Check the results of the computations instead of timing them",
+    )
+    args = parser.parse_args()
+
+    if args.check:
+        raise SystemExit(0 if run_checks(args.rows, args.seed) else 1)
+
+    steps = [
+        step
+        for step in UPLOAD_STEPS + PAGE_STEPS
+        if not args.pages or step[0] in args.pages
+    ]
+    results = run_benchmarks(
+        args.rows, steps, args.seed, not args.no_memory, args.engine
+    )
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(
+        json.dumps(
+            {
+                "meta": {
+                    "created_at": datetime.now().isoformat(timespec="seconds"),
+                    "python": platform.python_version(),
+                    "pandas": pd.__version__,
+                    "numpy": np.__version__,
+                    "platform": platform.platform(),
+                    "seed": args.seed,
+                    "engine": args.engine,
+                    "memory_traced": not args.no_memory,
+                },
+                "results": [asdict(result) for result in results],
+            },
+            indent=2,
+        )
+    )
+    print(f"\nResults saved to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
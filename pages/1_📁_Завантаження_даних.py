@@ -1,30 +1,95 @@
 import io
+from concurrent.futures import wait
 
-import pandas as pd
 import streamlit as st
 
-from app.data import customers_data, inventory_data, sales_data
+from app.data import (
+    DataConfig,
+    customers_data,
+    inventory_data,
+    sales_data,
+)
+from app.data_cache import file_fingerprint, submit_cached_load
+from app.data_delta import Upload, sync_uploads
+from app.data_directory import data_directory, from_data_directory
 from app.data_generators import (
     generate_sample_customers,
     generate_sample_inventory,
     generate_sample_sales,
 )
-from app.data_validator import DataValidator
+from app.data_loader import LoadResult, LoadTask
 from app.pages import dashboard_page, upload_page
+from app.precompute import precompute
+from app.timing import timed
 
 upload_page.render()
 
 
 # Data upload section.
-def read_file_content(uploaded_file: io.BytesIO) -> pd.DataFrame:
-    if uploaded_file.name.endswith(".csv"):
-        return pd.read_csv(uploaded_file)
-    elif uploaded_file.name.endswith(".xlsx"):
-        return pd.read_excel(uploaded_file)
-    else:
-        raise ValueError("Непідтримуваний формат файлу")
+def start_reading(
+    uploaded_file: io.BytesIO | None, data_config: DataConfig
+) -> LoadTask | None:
+    if uploaded_file is None:
+        return None
+    return submit_cached_load(uploaded_file, data_config)
+
+
+def read_file_content(uploaded_file: io.BytesIO, task: LoadTask) -> LoadResult:
+    if not task.future.done():
+        progress_text = f"Обробка файлу {uploaded_file.name}..."
+        progress_bar = st.progress(task.progress, text=progress_text)
+        try:
+            while not task.future.done():
+                wait([task.future], timeout=0.1)
+                progress_bar.progress(task.progress, text=progress_text)
+        finally:
+            progress_bar.empty()
+    return task.future.result()
+
+
+def read_delta_files(
+    delta_files: list[io.BytesIO], tasks: list[LoadTask], data_config: DataConfig
+) -> list[Upload]:
+    deltas = []
+    for delta_file, task in zip(delta_files, tasks):
+        try:
+            delta_df, errors = read_file_content(delta_file, task)
+        except Exception as err:
+            st.error(f"Помилка при читанні файлу {delta_file.name}: {err}", icon="❌")
+            continue
+
+        # Invalid delta files are left out, the rest are still merged.
+        if errors:
+            st.error(
+                f"Помилки у файлі змін {delta_file.name}:\n"
+                + "\n".join(f"- {error}" for error in errors),
+                icon="❌",
+            )
+        else:
+            deltas.append((file_fingerprint(delta_file, data_config), delta_df))
+    return deltas
 
 
+def delta_help(data_config: DataConfig) -> str:
+    return (
+        "Нові або виправлені рядки додаються до вже завантажених даних. Рядки з "
+        f"тими самими значеннями {', '.join(data_config.key_columns)} замінюються."
+    )
+
+
+if data_directory is not None:
+    st.info(
+        "Дані з каталогу сервера вже доступні для аналізу. Завантажені тут файли "
+        "замінюють їх лише в поточній сесії.",
+        icon="ℹ️",
+    )
+    for name, errors in data_directory.errors.items():
+        st.error(
+            f"Помилки у файлі {name} з каталогу сервера:\n"
+            + "\n".join(f"- {error}" for error in errors),
+            icon="❌",
+        )
+
 required_files_col, optional_files_col = st.columns(2)
 
 with required_files_col:
@@ -35,15 +100,70 @@ with required_files_col:
         type=["csv", "xlsx"],
         help=f"Файл повинен містити колонки: {', '.join(sales_data.column_names)}",
     )
+    sales_delta_files = st.file_uploader(
+        "Додайте файли змін продажів (CSV або Excel)",
+        type=["csv", "xlsx"],
+        accept_multiple_files=True,
+        disabled=sales_file is None,
+        help=delta_help(sales_data),
+    )
+    sales_container = st.container()
+
+    inventory_file = st.file_uploader(
+        "Завантажте файл складських запасів (CSV або Excel)",
+        type=["csv", "xlsx"],
+        help=f"Файл повинен містити колонки: {', '.join(inventory_data.column_names)}",
+    )
+    inventory_delta_files = st.file_uploader(
+        "Додайте файли змін складських запасів (CSV або Excel)",
+        type=["csv", "xlsx"],
+        accept_multiple_files=True,
+        disabled=inventory_file is None,
+        help=delta_help(inventory_data),
+    )
+    inventory_container = st.container()
+
+with optional_files_col:
+    st.subheader("Опціональні файли")
+
+    customers_file = st.file_uploader(
+        "Завантажте файл клієнтів (CSV або Excel)",
+        type=["csv", "xlsx"],
+        help=f"Файл повинен містити колонки: {', '.join(customers_data.column_names)}",
+    )
+    customers_container = st.container()
+
+# All attached files are parsed and validated at the same time.
+sales_task = start_reading(sales_file, sales_data)
+inventory_task = start_reading(inventory_file, inventory_data)
+customers_task = start_reading(customers_file, customers_data)
+sales_delta_tasks = [start_reading(file, sales_data) for file in sales_delta_files]
+inventory_delta_tasks = [
+    start_reading(file, inventory_data) for file in inventory_delta_files
+]
+
+with sales_container, timed("Завантаження продажів"):
     if sales_file is not None:
         try:
-            sales_df = read_file_content(sales_file)
-            errors = DataValidator(sales_df, sales_data).validate()
+            sales_df, errors = read_file_content(sales_file, sales_task)
 
             if not errors:
-                sales_data.session_state = sales_df
+                sales_deltas = read_delta_files(
+                    sales_delta_files, sales_delta_tasks, sales_data
+                )
+                sync_uploads(
+                    sales_data,
+                    (file_fingerprint(sales_file, sales_data), sales_df),
+                    sales_deltas,
+                )
                 st.success("Файл продажів успішно завантажено!", icon="✅")
-                st.dataframe(sales_df.head(10), use_container_width=True)
+                if sales_deltas:
+                    st.success(
+                        f"Застосовано файлів змін: {len(sales_deltas)}", icon="✅"
+                    )
+                st.dataframe(
+                    sales_data.session_state.head(10), use_container_width=True
+                )
             else:
                 st.error(
                     "Помилки у файлі продажів:\n"
@@ -52,23 +172,31 @@ with required_files_col:
                 )
         except Exception as err:
             st.error(f"Помилка при читанні файлу: {err}", icon="❌")
-    else:
+    elif not from_data_directory(sales_data):
         del sales_data.session_state
 
-    inventory_file = st.file_uploader(
-        "Завантажте файл складських запасів (CSV або Excel)",
-        type=["csv", "xlsx"],
-        help=f"Файл повинен містити колонки: {', '.join(inventory_data.column_names)}",
-    )
+with inventory_container, timed("Завантаження запасів"):
     if inventory_file is not None:
         try:
-            inventory_df = read_file_content(inventory_file)
-            errors = DataValidator(inventory_df, inventory_data).validate()
+            inventory_df, errors = read_file_content(inventory_file, inventory_task)
 
             if not errors:
-                inventory_data.session_state = inventory_df
+                inventory_deltas = read_delta_files(
+                    inventory_delta_files, inventory_delta_tasks, inventory_data
+                )
+                sync_uploads(
+                    inventory_data,
+                    (file_fingerprint(inventory_file, inventory_data), inventory_df),
+                    inventory_deltas,
+                )
                 st.success("Файл складських запасів успішно завантажено!", icon="✅")
-                st.dataframe(inventory_df.head(10), use_container_width=True)
+                if inventory_deltas:
+                    st.success(
+                        f"Застосовано файлів змін: {len(inventory_deltas)}", icon="✅"
+                    )
+                st.dataframe(
+                    inventory_data.session_state.head(10), use_container_width=True
+                )
             else:
                 st.error(
                     "Помилки у файлі складських запасів:\n"
@@ -77,24 +205,20 @@ with required_files_col:
                 )
         except Exception as err:
             st.error(f"Помилка при читанні файлу: {err}", icon="❌")
-    else:
+    elif not from_data_directory(inventory_data):
         del inventory_data.session_state
 
-with optional_files_col:
-    st.subheader("Опціональні файли")
-
-    customers_file = st.file_uploader(
-        "Завантажте файл клієнтів (CSV або Excel)",
-        type=["csv", "xlsx"],
-        help=f"Файл повинен містити колонки: {', '.join(customers_data.column_names)}",
-    )
+with customers_container, timed("Завантаження клієнтів"):
     if customers_file is not None:
         try:
-            customers_df = read_file_content(customers_file)
-            errors = DataValidator(customers_df, customers_data).validate()
+            customers_df, errors = read_file_content(customers_file, customers_task)
 
             if not errors:
-                customers_data.session_state = customers_df
+                sync_uploads(
+                    customers_data,
+                    (file_fingerprint(customers_file, customers_data), customers_df),
+                    [],
+                )
                 st.success("Файл клієнтів успішно завантажено!", icon="✅")
                 st.dataframe(customers_df.head(10), use_container_width=True)
             else:
@@ -105,16 +229,21 @@ with optional_files_col:
                 )
         except Exception as err:
             st.error(f"Помилка при читанні файлу: {err}", icon="❌")
-    else:
+    elif not from_data_directory(customers_data):
         del customers_data.session_state
 
+# Aggregates the analytics pages start from are built in the background while
+# the user is still here.
+for data_config in (sales_data, inventory_data, customers_data):
+    precompute(data_config)
+
 # Sample data download section.
 st.divider()
 st.subheader("Завантажити приклади файлів")
 
 sample_sales_col, sample_inventory_col, sample_customers_col = st.columns(3)
 
-with sample_sales_col:
+with sample_sales_col, timed("Приклад продажів"):
     sample_sales = generate_sample_sales().to_csv(index=False).encode("utf-8")
     st.download_button(
         "🛒 Приклад файлу продажів",
@@ -124,7 +253,7 @@ with sample_sales_col:
         help="Завантажити приклад файлу з даними про продажі",
     )
 
-with sample_inventory_col:
+with sample_inventory_col, timed("Приклад запасів"):
     sample_inventory = generate_sample_inventory().to_csv(index=False).encode("utf-8")
     st.download_button(
         "📦 Приклад файлу складу",
@@ -134,7 +263,7 @@ with sample_inventory_col:
         help="Завантажити приклад файлу зі складськими даними",
     )
 
-with sample_customers_col:
+with sample_customers_col, timed("Приклад клієнтів"):
     sample_customers = generate_sample_customers().to_csv(index=False).encode("utf-8")
     st.download_button(
         "👥 Приклад файлу клієнтів",
@@ -1,9 +1,12 @@
-import pandas as pd
 import plotly.express as px
 import streamlit as st
 
+from app.analytics import SalesFilters, filter_by_store, inventory_kpis
+from app.charts import downsample
 from app.data import customers_data, inventory_data, sales_data
+from app.engines import select_engine
 from app.pages import dashboard_page, upload_page
+from app.timing import timed
 
 dashboard_page.render()
 
@@ -20,6 +23,8 @@ if sales_df is None:
     )
     st.stop()
 
+engine = select_engine()
+
 # Sidebar filters
 with st.sidebar:
     st.subheader("Фільтри")
@@ -41,28 +46,29 @@ with st.sidebar:
     )
 
 # Apply filters to sales data
-mask = pd.Series(True, index=sales_df.index)
-
-if date_range and len(date_range) == 2:
-    mask &= sales_df["date"].dt.date.between(date_range[0], date_range[1])
-
-if selected_store != "Всі":
-    mask &= sales_df["store"] == selected_store
-
-filtered_sales_df = sales_df[mask]
+store_filter = selected_store if selected_store != "Всі" else None
+sales_filters = SalesFilters(
+    date_range=tuple(date_range) if date_range and len(date_range) == 2 else None,
+    stores=(store_filter,) if store_filter else None,
+)
+with timed("Фільтрація продажів", rows_in=len(sales_df)) as section:
+    sales_summary = engine.summarize_sales(sales_filters)
+    section.rows_out = int(sales_summary.total("orders"))
 
 # Filter inventory and customers data by store if selected
 if inventory_df is not None:
-    if selected_store != "Всі":
-        filtered_inventory_df = inventory_df[inventory_df["store"] == selected_store]
-    else:
-        filtered_inventory_df = inventory_df
+    with timed("Фільтрація запасів", rows_in=len(inventory_df)) as section:
+        filtered_inventory_df = filter_by_store(
+            inventory_df, store_filter, inventory_data.index
+        )
+        section.rows_out = len(filtered_inventory_df)
 
 if customers_df is not None:
-    if selected_store != "Всі":
-        filtered_customers_df = customers_df[customers_df["store"] == selected_store]
-    else:
-        filtered_customers_df = customers_df
+    with timed("Фільтрація клієнтів", rows_in=len(customers_df)) as section:
+        filtered_customers_df = filter_by_store(
+            customers_df, store_filter, customers_data.index
+        )
+        section.rows_out = len(filtered_customers_df)
 
 # Calculate KPIs
 st.subheader("📊 Ключові метрики")
@@ -72,47 +78,38 @@ sales_metrics, inventory_metrics, customer_metrics = st.tabs(
     ["🛍️ Продажі", "📦 Склад", "👥 Клієнти"]
 )
 
-with sales_metrics:
+with sales_metrics, timed("Метрики продажів"):
     kpi1, kpi2, kpi3 = st.columns(3)
 
     with kpi1:
-        total_revenue = filtered_sales_df["revenue"].sum()
+        total_revenue = sales_summary.total("revenue")
         st.metric("Загальний виторг", f"{total_revenue:,.2f} ₴")
 
     with kpi2:
-        avg_check = (
-            filtered_sales_df.groupby(["date", "store"])["revenue"].mean().mean()
-        )
+        avg_check = sales_summary.average_check
         st.metric("Середній чек", f"{avg_check:,.2f} ₴")
 
     with kpi3:
-        total_costs = (filtered_sales_df["cost"] * filtered_sales_df["quantity"]).sum()
-        gross_profit = filtered_sales_df["revenue"].sum() - total_costs
+        gross_profit = sales_summary.total("profit")
         st.metric("Валовий прибуток", f"{gross_profit:,.2f} ₴")
 
-with inventory_metrics:
+with inventory_metrics, timed("Метрики складу"):
     if inventory_df is not None:
         kpi4, kpi5, kpi6 = st.columns(3)
+        stock_kpis = inventory_kpis(filtered_inventory_df)
 
         with kpi4:
-            total_items = filtered_inventory_df["stock_qty"].sum()
-            st.metric("Загальна кількість", f"{total_items:,}")
+            st.metric("Загальна кількість", f"{stock_kpis.total_items:,}")
 
         with kpi5:
-            low_stock = filtered_inventory_df[
-                filtered_inventory_df["stock_qty"] < filtered_inventory_df["min_qty"]
-            ].shape[0]
-            st.metric("Товари з низьким запасом", f"{low_stock:,}")
+            st.metric("Товари з низьким запасом", f"{stock_kpis.low_stock:,}")
 
         with kpi6:
-            out_of_stock = filtered_inventory_df[
-                filtered_inventory_df["stock_qty"] == 0
-            ].shape[0]
-            st.metric("Відсутні товари", f"{out_of_stock:,}")
+            st.metric("Відсутні товари", f"{stock_kpis.zero_stock:,}")
     else:
         st.info("Завантажте дані про складські запаси для перегляду метрик", icon="ℹ️")
 
-with customer_metrics:
+with customer_metrics, timed("Метрики клієнтів"):
     if customers_df is not None:
         kpi7, kpi8, kpi9 = st.columns(3)
 
@@ -135,22 +132,23 @@ with customer_metrics:
 st.subheader("📈 Динаміка та структура продажів")
 
 # Line chart: Sales over time
-daily_sales = filtered_sales_df.groupby("date")["revenue"].sum().reset_index()
-fig_timeline = px.line(
-    daily_sales,
-    x="date",
-    y="revenue",
-    title="Динаміка продажів по днях",
-    labels={"date": "Дата", "revenue": "Виторг, ₴"},
-)
-st.plotly_chart(fig_timeline, use_container_width=True)
+with timed("Динаміка продажів"):
+    daily_sales = downsample(sales_summary.daily_totals("revenue")).reset_index()
+    fig_timeline = px.line(
+        daily_sales,
+        x="date",
+        y="revenue",
+        title="Динаміка продажів по днях",
+        labels={"date": "Дата", "revenue": "Виторг, ₴"},
+    )
+    st.plotly_chart(fig_timeline, use_container_width=True)
 
 # Create two columns for the remaining charts
 col1, col2 = st.columns(2)
 
-with col1:
+with col1, timed("Продажі по магазинах"):
     # Bar chart: Sales by store
-    sales_by_store = filtered_sales_df.groupby("store")["revenue"].sum().reset_index()
+    sales_by_store = sales_summary.totals_by("store", "revenue").reset_index()
     fig_stores = px.bar(
         sales_by_store,
         x="store",
@@ -160,9 +158,9 @@ with col1:
     )
     st.plotly_chart(fig_stores, use_container_width=True)
 
-with col2:
+with col2, timed("Продажі по категоріях"):
     # Pie chart: Sales by category
-    sales_by_category = filtered_sales_df.groupby("category")["revenue"].sum()
+    sales_by_category = sales_summary.totals_by("category", "revenue")
     fig_categories = px.pie(
         values=sales_by_category.values,
         names=sales_by_category.index,
@@ -1,7 +1,13 @@
 import streamlit as st
 
+from app.analytics import SalesFilters, filter_sales, sales_details
+from app.charts import downsample
 from app.data import sales_data
+from app.engines import select_engine
+from app.exports import export_button
 from app.pages import sales_page, upload_page
+from app.tables import paged_table
+from app.timing import timed
 
 sales_page.render()
 sales_df = sales_data.session_state
@@ -14,6 +20,8 @@ if sales_df is None:
     )
     st.stop()
 
+engine = select_engine()
+
 # Sidebar with metrics type selector and filters.
 with st.sidebar:
     metrics_type = st.radio(
@@ -71,188 +79,132 @@ with st.sidebar:
     )
 
 # Apply filters.
-mask = (
-    (sales_df["store"].isin(selected_stores))
-    & (sales_df["category"].isin(selected_categories))
-    & (sales_df["size"].isin(selected_sizes))
+filters = SalesFilters(
+    date_range=tuple(date_range) if date_range and len(date_range) == 2 else None,
+    stores=tuple(selected_stores),
+    categories=tuple(selected_categories),
+    products=tuple(selected_products),
+    sizes=tuple(selected_sizes),
+    gender=selected_gender if selected_gender != "Всі" else None,
 )
-
-if date_range and len(date_range) == 2:
-    mask &= sales_df["date"].dt.date >= date_range[0]
-    mask &= sales_df["date"].dt.date <= date_range[1]
-if selected_products:
-    mask &= sales_df["product_name"].isin(selected_products)
-if selected_gender != "Всі":
-    mask &= sales_df["gender"] == selected_gender
-
-filtered_df = sales_df[mask]
+with timed("Фільтрація", rows_in=len(sales_df)) as section:
+    summary = engine.summarize_sales(filters)
+    section.rows_out = int(summary.total("orders"))
 
 # Metrics tabs.
 metrics_tab, charts_tab, details_tab = st.tabs(
     ["📊 Ключові метрики", "📈 Графіки", "🔍 Деталі"]
 )
 
-# Calculate profit if needed
-if metrics_type == "Прибутку":
-    filtered_df["profit"] = filtered_df["revenue"] - (
-        filtered_df["cost"] * filtered_df["quantity"]
-    )
-
-with metrics_tab:
+with metrics_tab, timed("Ключові метрики"):
     col1, col2, col3, col4 = st.columns(4)
 
     if metrics_type == "Доходам":
         with col1:
-            total_revenue = filtered_df["revenue"].sum()
+            total_revenue = summary.total("revenue")
             st.metric("Загальний дохід", f"{total_revenue:,.2f} ₴")
 
         with col2:
-            avg_daily_revenue = filtered_df.groupby("date")["revenue"].sum().mean()
+            avg_daily_revenue = summary.daily_totals("revenue").mean()
             st.metric("Середній дохід на день", f"{avg_daily_revenue:,.2f} ₴")
 
         with col3:
-            avg_order_revenue = filtered_df["revenue"].mean()
+            avg_order_revenue = summary.average_order_value
             st.metric("Середній чек", f"{avg_order_revenue:,.2f} ₴")
 
         with col4:
-            top_product = (
-                filtered_df.groupby("product_name")["revenue"]
-                .sum()
-                .sort_values(ascending=False)
-                .index[0]
-            )
-            st.metric("Найбільш дохідний товар", top_product)
+            top_product_name = summary.top_product("revenue")
+            st.metric("Найбільш дохідний товар", top_product_name)
 
     elif metrics_type == "Прибутку":
         with col1:
-            total_profit = filtered_df["profit"].sum()
+            total_profit = summary.total("profit")
             st.metric("Загальний прибуток", f"{total_profit:,.2f} ₴")
 
         with col2:
-            avg_daily_profit = filtered_df.groupby("date")["profit"].sum().mean()
+            avg_daily_profit = summary.daily_totals("profit").mean()
             st.metric("Середній прибуток на день", f"{avg_daily_profit:,.2f} ₴")
 
         with col3:
-            margin_percent = (
-                filtered_df["profit"].sum() / filtered_df["revenue"].sum()
-            ) * 100
+            margin_percent = (total_profit / summary.total("revenue")) * 100
             st.metric("Середня маржа", f"{margin_percent:.1f}%")
 
         with col4:
-            top_product = (
-                filtered_df.groupby("product_name")["profit"]
-                .sum()
-                .sort_values(ascending=False)
-                .index[0]
-            )
-            st.metric("Найбільш прибутковий товар", top_product)
+            top_product_name = summary.top_product("profit")
+            st.metric("Найбільш прибутковий товар", top_product_name)
 
     elif metrics_type == "Кількості":
         with col1:
-            total_quantity = filtered_df["quantity"].sum()
+            total_quantity = summary.total("quantity")
             st.metric("Загальна кількість товарів", f"{total_quantity:,}")
 
         with col2:
-            unique_products = filtered_df["product_name"].nunique()
+            unique_products = summary.unique_products
             st.metric("Кількість унікальних товарів", f"{unique_products:,}")
 
         with col3:
-            avg_daily_quantity = filtered_df.groupby("date")["quantity"].sum().mean()
+            avg_daily_quantity = summary.daily_totals("quantity").mean()
             st.metric("Середня кількість на день", f"{avg_daily_quantity:.1f}")
 
         with col4:
-            top_product = (
-                filtered_df.groupby("product_name")["quantity"]
-                .sum()
-                .sort_values(ascending=False)
-                .index[0]
-            )
-            st.metric("Найбільш популярний товар", top_product)
+            top_product_name = summary.top_product("quantity")
+            st.metric("Найбільш популярний товар", top_product_name)
 
 with charts_tab:
     col1, col2 = st.columns(2)
 
     if metrics_type == "Доходам":
         st.subheader("📈 Динаміка доходів")
-        daily_revenue = filtered_df.groupby("date")["revenue"].sum().reset_index()
-        st.line_chart(daily_revenue.set_index("date"), use_container_width=True)
+        with timed("Динаміка"):
+            daily_revenue = downsample(summary.daily_totals("revenue"))
+            st.line_chart(daily_revenue, use_container_width=True)
 
-        with col1:
+        with col1, timed("Топ товарів"):
             st.subheader("🏆 Найбільш дохідні товари")
-            top_revenue_products = (
-                filtered_df.groupby("product_name")["revenue"]
-                .sum()
-                .sort_values(ascending=True)
-                .tail(10)
-            )
-            st.bar_chart(top_revenue_products)
+            st.bar_chart(summary.top_products("revenue"))
 
-        with col2:
+        with col2, timed("Категорії"):
             st.subheader("📊 Структура доходів по категоріях")
-            revenue_by_category = filtered_df.groupby("category")["revenue"].sum()
-            st.bar_chart(revenue_by_category)
+            st.bar_chart(summary.totals_by("category", "revenue"))
 
     elif metrics_type == "Прибутку":
         st.subheader("📈 Динаміка прибутку")
-        daily_profit = filtered_df.groupby("date")["profit"].sum().reset_index()
-        st.line_chart(daily_profit.set_index("date"), use_container_width=True)
+        with timed("Динаміка"):
+            daily_profit = downsample(summary.daily_totals("profit"))
+            st.line_chart(daily_profit, use_container_width=True)
 
-        with col1:
+        with col1, timed("Топ товарів"):
             st.subheader("🏆 Найбільш прибуткові товари")
-            top_profit_products = (
-                filtered_df.groupby("product_name")["profit"]
-                .sum()
-                .sort_values(ascending=True)
-                .tail(10)
-            )
-            st.bar_chart(top_profit_products)
+            st.bar_chart(summary.top_products("profit"))
 
-        with col2:
+        with col2, timed("Категорії"):
             st.subheader("📊 Структура прибутку по категоріях")
-            profit_by_category = filtered_df.groupby("category")["profit"].sum()
-            st.bar_chart(profit_by_category)
+            st.bar_chart(summary.totals_by("category", "profit"))
 
     elif metrics_type == "Кількості":
         st.subheader("📈 Динаміка продажів")
-        daily_quantity = filtered_df.groupby("date")["quantity"].sum().reset_index()
-        st.line_chart(daily_quantity.set_index("date"), use_container_width=True)
+        with timed("Динаміка"):
+            daily_quantity = downsample(summary.daily_totals("quantity"))
+            st.line_chart(daily_quantity, use_container_width=True)
 
-        with col1:
+        with col1, timed("Топ товарів"):
             st.subheader("🏆 Найбільш продавані товари")
-            top_quantity_products = (
-                filtered_df.groupby("product_name")["quantity"]
-                .sum()
-                .sort_values(ascending=True)
-                .tail(10)
-            )
-            st.bar_chart(top_quantity_products)
+            st.bar_chart(summary.top_products("quantity"))
 
-        with col2:
+        with col2, timed("Категорії"):
             st.subheader("📊 Розподіл продажів по категоріях")
-            quantity_by_category = filtered_df.groupby("category")["quantity"].sum()
-            st.bar_chart(quantity_by_category)
+            st.bar_chart(summary.totals_by("category", "quantity"))
 
 with details_tab:
     st.subheader("🔍 Детальна інформація")
 
-    columns_to_show = [
-        "date",
-        "store",
-        "product_name",
-        "category",
-        "size",
-        "quantity",
-        "price",
-        "revenue",
-        "cost",
-    ]
-    if "profit" in filtered_df.columns:
-        columns_to_show.append("profit")
-
-    st.dataframe(
-        filtered_df[columns_to_show].sort_values("date", ascending=False),
-        use_container_width=True,
-    )
+    with timed("Детальна таблиця", rows_in=len(sales_df)) as section:
+        details_df = sales_details(
+            filter_sales(sales_df, filters, sales_data.index),
+            with_profit=metrics_type == "Прибутку",
+        )
+        section.rows_out = len(details_df)
+        paged_table(details_df, "sales_details", sales_data, use_container_width=True)
 
-    csv = filtered_df[columns_to_show].to_csv(index=False).encode("utf-8")
-    st.download_button("📥 Експортувати", csv, "sales_analysis.csv", "text/csv")
+    with timed("Експорт", rows_in=len(details_df)):
+        export_button(details_df, "sales_analysis", "sales_export")
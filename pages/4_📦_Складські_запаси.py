@@ -1,9 +1,21 @@
-import pandas as pd
 import plotly.express as px
 import streamlit as st
 
+from app.analytics import (
+    InventoryFilters,
+    build_last_sales,
+    dead_stock_items,
+    filter_inventory,
+    inventory_kpis,
+    low_stock_items,
+    stock_by_category,
+    stock_status,
+)
 from app.data import inventory_data, sales_data
+from app.exports import export_button
 from app.pages import inventory_page, upload_page
+from app.tables import paged_table
+from app.timing import timed
 
 inventory_page.render()
 inventory_df = inventory_data.session_state
@@ -64,45 +76,36 @@ with st.sidebar:
     )
 
 # Apply filters.
-mask = (
-    (inventory_df["store"].isin(selected_stores))
-    & (inventory_df["category"].isin(selected_categories))
-    & (inventory_df["size"].isin(selected_sizes))
+filters = InventoryFilters(
+    stores=tuple(selected_stores),
+    categories=tuple(selected_categories),
+    sizes=tuple(selected_sizes),
 )
-
-filtered_df = inventory_df[mask]
+with timed("Фільтрація", rows_in=len(inventory_df)) as section:
+    filtered_df = filter_inventory(inventory_df, filters, inventory_data.index)
+    section.rows_out = len(filtered_df)
 
 # Calculate KPIs.
 st.subheader("📊 Ключові метрики")
 kpi1, kpi2, kpi3, kpi4, kpi5 = st.columns(5)
 
-# Calculate base metrics
-total_sku = filtered_df["product_id"].nunique()
-total_items = filtered_df["stock_qty"].sum()
+with timed("Ключові метрики", rows_in=len(filtered_df)):
+    kpis = inventory_kpis(filtered_df, excess_threshold)
 
 with kpi1:
-    st.metric("Загальна к-сть SKU", f"{total_sku:,}")
+    st.metric("Загальна к-сть SKU", f"{kpis.total_sku:,}")
 
 with kpi2:
-    low_stock_mask = filtered_df["stock_qty"] < filtered_df["min_qty"]
-    low_stock = filtered_df[low_stock_mask].shape[0]
-    st.metric("Низький запас", f"{low_stock:,}")
+    st.metric("Низький запас", f"{kpis.low_stock:,}")
 
 with kpi3:
-    zero_stock = filtered_df[filtered_df["stock_qty"] == 0].shape[0]
-    st.metric("Нульовий запас", f"{zero_stock:,}")
+    st.metric("Нульовий запас", f"{kpis.zero_stock:,}")
 
 with kpi4:
-    excess_mask = filtered_df["stock_qty"] > (filtered_df["min_qty"] * excess_threshold)
-    excess_stock = filtered_df[excess_mask].shape[0]
-    st.metric("Надлишковий запас", f"{excess_stock:,}")
+    st.metric("Надлишковий запас", f"{kpis.excess_stock:,}")
 
 with kpi5:
-    to_order_mask = (filtered_df["stock_qty"] <= filtered_df["min_qty"]) & (
-        filtered_df["stock_qty"] > 0
-    )
-    to_order = filtered_df[to_order_mask].shape[0]
-    st.metric("До замовлення", f"{to_order:,}")
+    st.metric("До замовлення", f"{kpis.to_order:,}")
 
 
 # Create tabs for different views.
@@ -116,27 +119,10 @@ stock_level_tab, low_stock_tab, dead_stock_tab, table_tab = st.tabs(
 )
 
 
-def color_status(row):
-    if row["stock_qty"] == 0:
-        return ["background-color: #ffcccc" for _ in row]  # Red
-    elif row["stock_qty"] < row["min_qty"]:
-        return ["background-color: #fff3cd" for _ in row]  # Yellow
-    return ["background-color: #d1e7dd" for _ in row]  # Green
-
-
-with stock_level_tab:
+with stock_level_tab, timed("Рівень залишків", rows_in=len(filtered_df)):
     st.subheader("📉 Рівень залишків по категоріях")
 
-    stock_by_cat = (
-        filtered_df.groupby(["category", "store"])["stock_qty"].sum().reset_index()
-    )
-    total_by_cat = (
-        stock_by_cat.groupby("category")["stock_qty"]
-        .sum()
-        .reset_index()
-        .rename(columns={"stock_qty": "total"})
-    )
-    stock_by_cat = stock_by_cat.merge(total_by_cat, on="category")
+    stock_by_cat, total_by_cat = stock_by_category(filtered_df)
 
     chart_labels = {
         "category": "Категорія",
@@ -165,17 +151,16 @@ with stock_level_tab:
     fig.update_traces(textposition="inside")
     st.plotly_chart(fig, use_container_width=True)
 
-with low_stock_tab:
+with low_stock_tab, timed("Низький запас", rows_in=len(filtered_df)) as section:
     st.subheader("🧯 Товари з низьким запасом")
 
-    low_stock_df = filtered_df[filtered_df["stock_qty"] < filtered_df["min_qty"]]
+    low_stock_df = low_stock_items(filtered_df)
+    section.rows_out = len(low_stock_df)
     if not low_stock_df.empty:
-        styled_df = low_stock_df[
-            ["product_name", "store", "category", "stock_qty", "min_qty"]
-        ].style.apply(color_status, axis=1)
-
         st.dataframe(
-            styled_df,
+            low_stock_df[
+                ["product_name", "store", "category", "stock_qty", "min_qty"]
+            ].assign(status=stock_status(low_stock_df)),
             column_config={
                 "product_name": "Назва",
                 "store": "Магазин",
@@ -186,42 +171,33 @@ with low_stock_tab:
                 "min_qty": st.column_config.NumberColumn(
                     "Мінімум", help="Мінімальна необхідна кількість"
                 ),
+                "status": "Статус",
             },
             height=400,
         )
     else:
         st.info("Немає товарів з низьким запасом", icon="ℹ️")
 
-with dead_stock_tab:
+with dead_stock_tab, timed("Мертвий склад", rows_in=len(filtered_df)) as section:
     st.subheader("🧊 Мертвий склад")
 
     if sales_df is not None:
-        last_sale_date = (
-            sales_df.groupby(["store", "product_id"])["date"]
-            .max()
-            .reset_index()
-            .rename(columns={"date": "last_sale_date"})
-        )
-
-        dead_stock_df = filtered_df.merge(
-            last_sale_date, on=["store", "product_id"], how="left"
+        by_size = st.toggle(
+            "Враховувати розмір",
+            help="Шукати останній продаж саме цього розміру товару, а не будь-якого",
         )
-
-        dead_stock_threshold = pd.Timestamp("now") - pd.Timedelta(days=dead_stock_days)
-        dead_stock_mask = (
-            (dead_stock_df["last_sale_date"] < dead_stock_threshold)
-            | (dead_stock_df["last_sale_date"].isna())
-        ) & (dead_stock_df["stock_qty"] > dead_stock_df["min_qty"] * excess_threshold)
-
-        dead_stock_items = dead_stock_df[dead_stock_mask].sort_values(
-            "stock_qty", ascending=False
+        dead_stock_df = dead_stock_items(
+            filtered_df,
+            sales_data.derive("last_sales", build_last_sales),
+            dead_stock_days,
+            excess_threshold,
+            by_size,
         )
+        section.rows_out = len(dead_stock_df)
 
-        if not dead_stock_items.empty:
+        if not dead_stock_df.empty:
             st.dataframe(
-                dead_stock_items[
-                    ["product_name", "store", "stock_qty", "last_sale_date"]
-                ],
+                dead_stock_df[["product_name", "store", "stock_qty", "last_sale_date"]],
                 column_config={
                     "product_name": "Назва",
                     "store": "Магазин",
@@ -237,24 +213,24 @@ with dead_stock_tab:
     else:
         st.warning("Для аналізу мертвого складу потрібні дані продажів", icon="⚠️")
 
-with table_tab:
+with table_tab, timed("Детальна таблиця", rows_in=len(filtered_df)):
     st.subheader("📋 Повна таблиця складських запасів")
 
     columns = ["product_name", "category", "size", "stock_qty", "min_qty", "store"]
 
-    styled_df = filtered_df[columns].style.apply(color_status, axis=1)
-
     with st.expander("ℹ️ Кольорове позначення статусів"):
         st.markdown(
             """
-            - 🔴 **Червоний** - Товар відсутній на складі (нульовий запас)
-            - 🟡 **Жовтий** - Низький запас (менше мінімальної кількості)
-            - 🟢 **Зелений** - Нормальний рівень запасу
+            - 🔴 **Відсутній** - Товар відсутній на складі (нульовий запас)
+            - 🟡 **Низький** - Низький запас (менше мінімальної кількості)
+            - 🟢 **Нормальний** - Нормальний рівень запасу
             """
         )
 
-    st.dataframe(
-        styled_df,
+    paged_table(
+        filtered_df[columns].assign(status=stock_status(filtered_df)),
+        "inventory_table",
+        inventory_data,
         column_config={
             "product_name": "Товар",
             "category": "Категорія",
@@ -262,9 +238,9 @@ with table_tab:
             "stock_qty": "Запас",
             "min_qty": "Мін. запас",
             "store": "Магазин",
+            "status": "Статус",
         },
         height=600,
     )
 
-    csv = filtered_df[columns].to_csv(index=False).encode("utf-8")
-    st.download_button("📥 Експортувати", csv, "inventory_export.csv", "text/csv")
+    export_button(filtered_df[columns], "inventory_export", "inventory_export")
@@ -1,11 +1,23 @@
-from datetime import datetime, timedelta
-
 import pandas as pd
 import plotly.express as px
 import streamlit as st
 
+from app.analytics import (
+    CustomerFilters,
+    add_status_flags,
+    add_status_labels,
+    customers_table,
+    filter_by_statuses,
+    filter_customers,
+    inactive_customers,
+    monthly_signups,
+)
 from app.data import customers_data, sales_data
+from app.exports import export_button
 from app.pages import customers_page, upload_page
+from app.segmentation import add_rfm
+from app.tables import paged_table
+from app.timing import timed
 
 customers_page.render()
 customers_df = customers_data.session_state
@@ -66,63 +78,53 @@ with st.sidebar:
         help="Клієнти без покупок протягом цього періоду вважаються неактивними",
     )
 
-mask = (customers_df["store"].isin(selected_stores)) & (
-    customers_df["age"].between(age_range[0], age_range[1])
+filters = CustomerFilters(
+    stores=tuple(selected_stores),
+    gender=selected_gender if selected_gender != "Всі" else None,
+    age_range=age_range,
 )
+# RFM scores are relative to the whole customer base, so they are computed
+# once per upload rather than for the filtered customers.
+with timed("Фільтрація", rows_in=len(customers_df)) as section:
+    filtered_df = filter_customers(
+        customers_data.derive("rfm", add_rfm), filters, customers_data.index
+    )
 
-if selected_gender != "Всі":
-    mask &= customers_df["gender"] == selected_gender
-
-filtered_df = customers_df[mask].copy()
-
-# Add status flags instead of a single segment
-filtered_df["is_new"] = filtered_df["total_orders"] == 1
-filtered_df["is_regular"] = filtered_df["total_orders"] > 1
-filtered_df["is_vip"] = filtered_df["total_spent"] >= vip_threshold
-
-# Apply status filters
-if status_filters:
-    status_mask = pd.Series(False, index=filtered_df.index)
-    if "Нові" in status_filters:
-        status_mask |= filtered_df["is_new"]
-    if "Постійні" in status_filters:
-        status_mask |= filtered_df["is_regular"]
-    if "VIP" in status_filters:
-        status_mask |= filtered_df["is_vip"]
-    filtered_df = filtered_df[status_mask]
-
-# Create a combined status label for display
-filtered_df["statuses"] = filtered_df.apply(
-    lambda row: " + ".join(
-        ["VIP" if row["is_vip"] else "", "Постійний" if row["is_regular"] else "Новий"]
-    ).strip(" + "),
-    axis=1,
-)
+    # Add status flags instead of a single segment
+    filtered_df = add_status_flags(filtered_df, vip_threshold)
+
+    # Apply status filters
+    filtered_df = filter_by_statuses(filtered_df, status_filters)
+
+    # Create a combined status label for display
+    filtered_df = add_status_labels(filtered_df)
+    section.rows_out = len(filtered_df)
 
 st.subheader("📊 Ключові метрики")
 kpi1, kpi2, kpi3, kpi4, kpi5 = st.columns(5)
 
-total_customers = len(filtered_df)
-with kpi1:
-    st.metric("Кількість клієнтів", f"{total_customers:,}")
+with timed("Ключові метрики", rows_in=len(filtered_df)):
+    total_customers = len(filtered_df)
+    with kpi1:
+        st.metric("Кількість клієнтів", f"{total_customers:,}")
 
-with kpi2:
-    avg_orders = filtered_df["total_orders"].mean()
-    st.metric("Середня к-сть покупок", f"{avg_orders:.1f}")
+    with kpi2:
+        avg_orders = filtered_df["total_orders"].mean()
+        st.metric("Середня к-сть покупок", f"{avg_orders:.1f}")
 
-with kpi3:
-    avg_check = (filtered_df["total_spent"] / filtered_df["total_orders"]).mean()
-    st.metric("Середній чек", f"{avg_check:,.2f} ₴")
+    with kpi3:
+        avg_check = (filtered_df["total_spent"] / filtered_df["total_orders"]).mean()
+        st.metric("Середній чек", f"{avg_check:,.2f} ₴")
 
-with kpi4:
-    loyal_customers = (filtered_df["total_orders"] > 1).sum()
-    loyal_percent = (loyal_customers / total_customers) * 100
-    st.metric("Постійні клієнти", f"{loyal_percent:.1f}%")
+    with kpi4:
+        loyal_customers = (filtered_df["total_orders"] > 1).sum()
+        loyal_percent = (loyal_customers / total_customers) * 100
+        st.metric("Постійні клієнти", f"{loyal_percent:.1f}%")
 
-with kpi5:
-    vip_customers = (filtered_df["total_spent"] >= vip_threshold).sum()
-    vip_percent = (vip_customers / total_customers) * 100
-    st.metric("VIP-клієнти", f"{vip_percent:.1f}%")
+    with kpi5:
+        vip_customers = (filtered_df["total_spent"] >= vip_threshold).sum()
+        vip_percent = (vip_customers / total_customers) * 100
+        st.metric("VIP-клієнти", f"{vip_percent:.1f}%")
 
 tab_names = [
     "🎯 Сегментація",
@@ -134,13 +136,15 @@ tab_names = [
 ]
 tabs = st.tabs(tab_names)
 
-with tabs[0]:  # Segmentation
+with tabs[0], timed("Сегментація"):
     st.subheader("🎯 Сегментація клієнтів")
     col1, col2 = st.columns(2)
 
     with col1:
         # Calculate status combinations
-        status_combinations = filtered_df["statuses"].value_counts()
+        status_combinations = (
+            filtered_df["statuses"].value_counts().loc[lambda counts: counts > 0]
+        )
         fig1 = px.pie(
             values=status_combinations.values,
             names=status_combinations.index,
@@ -161,7 +165,7 @@ with tabs[0]:  # Segmentation
         )
 
     with col2:
-        store_dist = filtered_df["store"].value_counts()
+        store_dist = filtered_df["store"].value_counts().loc[lambda counts: counts > 0]
         fig2 = px.bar(
             x=store_dist.index,
             y=store_dist.values,
@@ -170,7 +174,26 @@ with tabs[0]:  # Segmentation
         )
         st.plotly_chart(fig2, use_container_width=True)
 
-with tabs[1]:  # Frequency
+    segment_stats = (
+        filtered_df.groupby("segment", observed=True)
+        .agg(customers=("customer_id", "count"), avg_spent=("total_spent", "mean"))
+        .reset_index()
+    )
+    fig_segments = px.bar(
+        segment_stats,
+        x="segment",
+        y="customers",
+        title="Розподіл клієнтів за RFM-сегментами",
+        text=segment_stats["avg_spent"].round(2).astype(str) + " ₴",
+        labels={"segment": "Сегмент", "customers": "К-сть клієнтів"},
+    )
+    st.plotly_chart(fig_segments, use_container_width=True)
+    st.caption(
+        "RFM-сегменти оцінюють давність останньої покупки, частоту замовлень та "
+        "суму витрат клієнта від 1 до 5 відносно всієї бази клієнтів"
+    )
+
+with tabs[1], timed("Частота покупок"):
     st.subheader("📊 Аналіз частоти покупок")
 
     fig3 = px.histogram(
@@ -188,7 +211,7 @@ with tabs[1]:  # Frequency
     freq_pct = (filtered_df["total_orders"] <= 2).mean() * 100
     cols[2].markdown(f"**Інсайт:** {freq_pct:.1f}% клієнтів зробили 1-2 замовлення")
 
-with tabs[2]:  # LTV
+with tabs[2], timed("LTV"):
     st.subheader("💰 Аналіз Lifetime Value")
     col1, col2 = st.columns(2)
 
@@ -208,7 +231,7 @@ with tabs[2]:  # LTV
         st.plotly_chart(fig4, use_container_width=True)
 
     with col2:
-        avg_ltv = filtered_df.groupby("store")["total_spent"].mean()
+        avg_ltv = filtered_df.groupby("store", observed=True)["total_spent"].mean()
         fig5 = px.bar(
             x=avg_ltv.index,
             y=avg_ltv.values,
@@ -217,7 +240,7 @@ with tabs[2]:  # LTV
         )
         st.plotly_chart(fig5, use_container_width=True)
 
-with tabs[3]:  # Demographics
+with tabs[3], timed("Демографія"):
     st.subheader("👥 Демографічний аналіз")
     col1, col2 = st.columns(2)
 
@@ -232,7 +255,7 @@ with tabs[3]:  # Demographics
 
     with col2:
         gender_stats = (
-            filtered_df.groupby("gender")
+            filtered_df.groupby("gender", observed=True)
             .agg({"customer_id": "count", "total_spent": "mean"})
             .reset_index()
         )
@@ -247,28 +270,20 @@ with tabs[3]:  # Demographics
         )
         st.plotly_chart(fig7, use_container_width=True)
 
-with tabs[4]:  # Dynamics
+with tabs[4], timed("Динаміка"):
     st.subheader("📈 Динаміка клієнтської бази")
 
-    monthly_signups = pd.DataFrame(
-        {
-            "month": pd.to_datetime(filtered_df["signup_date"]).dt.to_period("M"),
-            "count": 1,
-        }
-    )
-    monthly_signups = monthly_signups.groupby("month")["count"].sum()
+    signups_by_month = monthly_signups(filtered_df)
 
     fig8 = px.line(
-        x=monthly_signups.index.astype(str),
-        y=monthly_signups.values,
+        x=signups_by_month.index.astype(str),
+        y=signups_by_month.values,
         title="Нові клієнти по місяцях",
         labels={"x": "Місяць", "y": "К-сть нових клієнтів"},
     )
     st.plotly_chart(fig8, use_container_width=True)
 
-    inactive_threshold = datetime.now() - timedelta(days=inactive_days)
-    inactive_mask = filtered_df["last_purchase_date"] < inactive_threshold
-    inactive_count = inactive_mask.sum()
+    inactive_count = inactive_customers(filtered_df, inactive_days)
     inactive_pct = (inactive_count / total_customers) * 100
 
     st.metric(
@@ -277,21 +292,15 @@ with tabs[4]:  # Dynamics
         help=f"Клієнти без покупок останні {inactive_days} днів",
     )
 
-with tabs[5]:  # Table
+with tabs[5], timed("Детальна таблиця"):
     st.subheader("📋 Детальна інформація про клієнтів")
 
-    display_cols = [
-        "customer_id",
-        "total_orders",
-        "total_spent",
-        "last_purchase_date",
-        "statuses",
-    ]
-    table_df = filtered_df[display_cols].copy()
-    table_df["avg_check"] = table_df["total_spent"] / table_df["total_orders"]
-
-    st.dataframe(
+    table_df = customers_table(filtered_df)
+
+    paged_table(
         table_df,
+        "customers_table",
+        customers_data,
         column_config={
             "customer_id": "ID клієнта",
             "total_orders": "К-сть замовлень",
@@ -303,15 +312,17 @@ with tabs[5]:  # Table
                 "Остання покупка", format="DD.MM.YYYY"
             ),
             "statuses": "Статуси клієнта",
+            "segment": "Сегмент RFM",
+            "rfm_score": st.column_config.NumberColumn(
+                "RFM", help="Оцінки давності, частоти та суми покупок від 1 до 5"
+            ),
         },
         height=400,
     )
 
-    csv = table_df.to_csv(index=False).encode("utf-8")
-    st.download_button(
-        "📥 Експортувати",
-        csv,
-        "customers_analysis.csv",
-        "text/csv",
-        help="Завантажити таблицю в форматі CSV",
+    export_button(
+        table_df,
+        "customers_analysis",
+        "customers_export",
+        help="Завантажити таблицю у вибраному форматі",
     )